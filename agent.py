@@ -1,62 +1,23 @@
-import logging
-import json
-import asyncio
-from dotenv import load_dotenv
-from livekit.agents import (
-    Agent,
-    AgentSession,
-    JobContext,
-    RoomInputOptions,
-    WorkerOptions,
-    cli,
-)
-from livekit.plugins import google, noise_cancellation
-from google.genai import types
-
-logger = logging.getLogger("agent")
-load_dotenv(".env")
-
-class Assistant(Agent):
-    def __init__(self) -> None:
-        super().__init__(instructions="")
-
-async def entrypoint(ctx: JobContext):
-    llm = google.beta.realtime.RealtimeModel(
-        model="gemini-2.5-flash-native-audio-preview-09-2025",
-        voice="Puck",
-        input_audio_transcription=types.RealtimeInputConfig(),
-        instructions="""You are a helpful voice AI assistant. The user is interacting with you via voice.
-        Your responses are concise and friendly."""
-    )
-    session = AgentSession(llm=llm)
-
-    async def on_user_transcript(event):
-        data_to_send = json.dumps({
-            "type": "user_transcript",
-            "is_final": event.is_final,
-            "text": event.transcript
-        })
-        await ctx.room.local_participant.publish_data(data_to_send)
-
-    async def on_llm_chunk(event):
-        data_to_send = json.dumps({
-            "type": "agent_chunk",
-            "text": event.chunk.text
-        })
-        await ctx.room.local_participant.publish_data(data_to_send)
-
-    session.on("user_transcript", lambda event: asyncio.create_task(on_user_transcript(event)))
-    session.on("llm_chunk", lambda event: asyncio.create_task(on_llm_chunk(event)))
-
-    await session.start(
-        agent=Assistant(),
-        room=ctx.room,
-        room_input_options=RoomInputOptions(
-            noise_cancellation=noise_cancellation.BVC(),
-        ),
-    )
-    await ctx.connect()
-    # Iske aage koi ctx.run() nahi hai. Yeh sahi hai.
+"""
+Realtime entrypoint, kept so `python agent.py dev` still starts a worker.
+
+The realtime and pipeline agents share one entrypoint in backend/agent.py,
+which picks the mode from the requested model (see session_factory.py).
+"""
+import os
+import sys
+
+# Jobs that do not request a model keep running the realtime model here
+os.environ.setdefault("AGENT_MODE", "realtime")
+# backend/ modules import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+# Before livekit.agents, which imports prometheus_client (see backend/exporter.py)
+import exporter  # noqa: E402
+from livekit.agents import cli  # noqa: E402
+from agent import entrypoint, prewarm  # noqa: E402  (backend/agent.py, this file runs as __main__)
+from worker import make_worker_options  # noqa: E402
 
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint))
\ No newline at end of file
+    exporter.start_metrics_server()
+    cli.run_app(make_worker_options(entrypoint, prewarm_fnc=prewarm, loop_lag_fn=exporter.current_loop_lag))
@@ -1,16 +1,36 @@
 import logging
 import json
 import asyncio
-from datetime import datetime
+import os
+import time
 from dotenv import load_dotenv
 
-from livekit.agents import Agent, AgentSession, JobContext, WorkerOptions, cli, MetricsCollectedEvent
+# Before livekit.agents, which imports prometheus_client (see exporter.py)
+import exporter
+from livekit.agents import Agent, JobContext, JobProcess, ModelSettings, RoomInputOptions, cli, MetricsCollectedEvent
 from livekit.agents import metrics as agent_metrics  # Import metrics module
-from livekit.plugins import google
+from livekit.plugins import google, noise_cancellation
 from livekit.plugins import silero
 # from livekit.plugins.google import GoogleSearch
 
-from prompts import INSTRUCTIONS, WELCOME_MESSAGE
+from prompts import INSTRUCTIONS, REALTIME_INSTRUCTIONS, WELCOME_MESSAGE
+from answer_cache import AnswerCache
+from audio_cache import AudioCache
+from chunking import TextChunker, chunk_stream, synthesize_pipelined
+from compaction import ContextCompactor, context_budget, llm_summarizer
+from endpointing import AdaptiveEndpointing, EndpointingMonitor
+from latency import (
+    EOU_METRICS_TYPES,
+    LLM_METRICS_TYPES,
+    LatencyAggregator,
+    report_periodically,
+)
+from publisher import DataPublisher
+from instrumentation import SessionInstrumentation
+from session_factory import DEFAULT_PIPELINE_MODEL, ClientPool, create_session, resolve_mode
+from speculation import Speculator
+from telemetry import TelemetrySink, metrics_record, usage_record
+from worker import make_worker_options
 
 # ----------------- Setup Logger -----------------
 logger = logging.getLogger("agent")
@@ -22,75 +42,406 @@ logger.addHandler(handler)
 
 load_dotenv(".env")
 
+# ----------------- VAD Defaults -----------------
+# Per-job overrides can be sent as a "vad" object in job metadata.
+VAD_DEFAULTS = {
+    "min_speech_duration": 0.3,
+    "min_silence_duration": 1.0,
+    "prefix_padding_duration": 0.5,
+    "max_buffered_speech": 60.0,
+    "activation_threshold": 0.5,
+}
+
+# "fixed" keeps the VAD options above for the whole session, "adaptive" tunes
+# them per session (see endpointing.py). Per job: "endpointing" in metadata.
+ENDPOINTING_MODE = os.getenv("ENDPOINTING", "fixed")
+
+# "on" compacts the LLM context of long calls (see compaction.py), "off" sends
+# the full history every turn. Per job: "compaction" in metadata, budgets in "context".
+CONTEXT_COMPACTION = os.getenv("CONTEXT_COMPACTION", "on")
+# Writes the running summary of older turns
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", DEFAULT_PIPELINE_MODEL)
+
+# "on" starts the LLM on stable interim transcripts before the turn is
+# committed (see speculation.py). Per job: "speculation" in metadata.
+SPECULATION_MODE = os.getenv("SPECULATION", "off")
+
+# Per-turn telemetry files (see telemetry.py), "jsonl" or "parquet".
+# Off unless TELEMETRY_DIR is set. Transcript rows (what callers and the agent
+# said) are only written with TELEMETRY_TRANSCRIPTS=on. Files are never
+# deleted here, expire them on the host to match your retention policy.
+TELEMETRY_DIR = os.getenv("TELEMETRY_DIR", "")
+TELEMETRY_FORMAT = os.getenv("TELEMETRY_FORMAT", "jsonl")
+TELEMETRY_TRANSCRIPTS = os.getenv("TELEMETRY_TRANSCRIPTS", "off")
+
+# Seconds between periodic latency summaries while a session is running
+LATENCY_REPORT_INTERVAL = 60.0
+
+# Segment sizes (in characters) for the text chunking stage in front of TTS
+TTS_CHUNKING = {
+    "first_min_chars": 20,
+    "first_max_chars": 60,
+    "min_chars": 60,
+    "max_chars": 250,
+}
+# Segments synthesized ahead of the one currently playing
+TTS_MAX_CONCURRENCY = 2
+
+# Part of the audio cache key, change it whenever the google.TTS voice settings change
+TTS_VOICE = "google-default"
+
+# Spoken prompts synthesized once into AUDIO_CACHE_DIR when a worker process
+# starts, then played from there by every job
+STATIC_PROMPTS = [WELCOME_MESSAGE]
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", "cache/audio")
+
+# "on" answers a call's first question from the cache shared by every job on
+# the host (see answer_cache.py). Per job: "answer_cache" (true/false) in metadata.
+ANSWER_CACHE_MODE = os.getenv("ANSWER_CACHE", "off")
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "cache/answers.sqlite3")
+ANSWER_CACHE_OPTIONS = {
+    "max_entries": 1024,
+    "ttl": 300.0,
+}
+
+# Handlers slower than this (seconds) are logged and counted
+HANDLER_BUDGET = 0.05
+
+# ----------------- Prewarm -----------------
+def prewarm(proc: JobProcess):
+    """Load heavy plugin objects once per worker process and share them with every job."""
+    load_plugins(proc)
+    proc.userdata["clients"] = ClientPool()
+    proc.userdata["clients"].warm()
+    proc.userdata["audio_cache"] = AudioCache(
+        disk_dir=AUDIO_CACHE_DIR,
+        lookup_counter=exporter.AUDIO_CACHE_LOOKUPS,
+    )
+    prerender_static_prompts(proc.userdata["audio_cache"])
+    proc.userdata["answer_cache"] = AnswerCache(
+        ANSWER_CACHE_PATH,
+        **ANSWER_CACHE_OPTIONS,
+        lookup_counter=exporter.ANSWER_CACHE_LOOKUPS,
+    )
+    logger.info("🔥 Worker process prewarmed (VAD, STT, TTS, LLM clients, audio cache)")
+
+
+def load_plugins(proc: JobProcess):
+    """The VAD, STT and TTS every job used to build for itself."""
+    proc.userdata["vad"] = silero.VAD.load(force_cpu=True, **VAD_DEFAULTS)
+    proc.userdata["stt"] = google.STT()
+    proc.userdata["tts"] = google.TTS()
+
+
+def prerender_static_prompts(audio_cache: AudioCache):
+    """Make sure STATIC_PROMPTS are on disk. Only the first process on a host (or a new voice) calls TTS."""
+    started = time.perf_counter()
+    try:
+        # Own TTS client on a short-lived loop, the shared one is bound to the job's loop later
+        rendered = asyncio.run(audio_cache.prerender(STATIC_PROMPTS, google.TTS(), TTS_VOICE))
+    except Exception as e:
+        logger.warning(f"Could not pre-render static prompts, they will be synthesized on first use: {e}")
+        return
+    if rendered:
+        logger.info(f"🔊 Pre-rendered {rendered} static prompts in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+
+def resolve_vad_options(metadata: dict) -> dict:
+    """Merge per-job VAD overrides from job metadata over VAD_DEFAULTS."""
+    options = dict(VAD_DEFAULTS)
+    overrides = metadata.get("vad") or {}
+    if not isinstance(overrides, dict):
+        logger.warning("Ignoring non-object 'vad' metadata")
+        return options
+    for key, value in overrides.items():
+        if key not in VAD_DEFAULTS:
+            logger.warning(f"Ignoring unknown VAD option: {key}")
+            continue
+        try:
+            options[key] = float(value)
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring invalid value for VAD option {key}: {value!r}")
+    return options
+
 # ----------------- Agent Class -----------------
+def last_user_text(chat_ctx) -> str:
+    for item in reversed(chat_ctx.items):
+        if item.type == "message" and item.role == "user":
+            return item.text_content or ""
+    return ""
+
+
+def first_user_turn(chat_ctx) -> bool:
+    """Whether the last user message is the only one, so its answer cannot depend on earlier turns."""
+    return sum(1 for item in chat_ctx.items if item.type == "message" and item.role == "user") == 1
+
+
 class SearchAssistant(Agent):
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        model: str = DEFAULT_PIPELINE_MODEL,
+        answer_cache: AnswerCache = None,
+        compactor: ContextCompactor = None,
+        speculator: Speculator = None,
+    ) -> None:
         super().__init__(instructions=INSTRUCTIONS)
+        self._model = model
+        self._answer_cache = answer_cache
+        self._compactor = compactor
+        self._speculator = speculator
+        if speculator is not None:
+            speculator.bind(self._speculate)
+
+    def _speculate(self, text):
+        """Start answering a turn that ends in text before it is committed, see speculation.py."""
+        chat_ctx = self.chat_ctx.copy()
+        chat_ctx.add_message(role="user", content=text)
+        # Recorded in llm_node if the speculation is committed
+        request_ctx = self._compactor.compact(chat_ctx, record=False) if self._compactor is not None else chat_ctx
+        return chat_ctx, self._answer(request_ctx, self.tools, ModelSettings(), first_user_turn(chat_ctx))
+
+    async def llm_node(self, chat_ctx, tools, model_settings):
+        """Commit a matching speculative answer or compact the history, then summarize older turns once the reply is done."""
+        speculation = None
+        if self._speculator is not None:
+            speculation = self._speculator.take(chat_ctx, last_user_text(chat_ctx))
+        if speculation is not None:
+            logger.info(f"🔮 Using speculative answer for: \"{speculation.text}\"")
+            if self._compactor is not None:
+                # Same history the speculation was compacted from, counts it and queues older turns for the summary
+                self._compactor.compact(chat_ctx)
+            chunks = speculation.stream()
+        elif self._compactor is not None:
+            chunks = self._answer(self._compactor.compact(chat_ctx), tools, model_settings, first_user_turn(chat_ctx))
+        else:
+            chunks = self._answer(chat_ctx, tools, model_settings, first_user_turn(chat_ctx))
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            if speculation is not None:
+                speculation.cancel()
+            if self._compactor is not None:
+                self._compactor.summarize_later()
+
+    async def _answer(self, chat_ctx, tools, model_settings, first_turn=False):
+        """Answer repeated first questions from the answer cache, skipping the grounded LLM call."""
+        cache = self._answer_cache
+        question = last_user_text(chat_ctx)
+        # Follow-ups ("how old is he") mean something else in another caller's conversation
+        if cache is None or not first_turn or not cache.cacheable(question):
+            async for chunk in Agent.default.llm_node(self, chat_ctx, tools, model_settings):
+                yield chunk
+            return
+
+        answer = cache.get(question, self._model)
+        if answer is not None:
+            logger.info(f"💾 Answer cache hit for: \"{question}\"")
+            yield answer
+            return
+
+        parts = []
+        async for chunk in Agent.default.llm_node(self, chat_ctx, tools, model_settings):
+            if isinstance(chunk, str):
+                parts.append(chunk)
+            elif chunk.delta and chunk.delta.content:
+                parts.append(chunk.delta.content)
+            yield chunk
+        if parts:
+            cache.put(question, self._model, "".join(parts))
+
+    async def tts_node(self, text, model_settings):
+        """For TTS without streaming, split the LLM stream into phrases and synthesize them concurrently."""
+        tts = self.session.tts
+        if tts.capabilities.streaming:
+            # Already takes the text as it arrives, over one stream
+            async for frame in Agent.default.tts_node(self, text, model_settings):
+                yield frame
+            return
+
+        conn_options = self.session.conn_options.tts_conn_options
+
+        async def synthesize(segment):
+            async with tts.synthesize(segment, conn_options=conn_options) as stream:
+                async for audio in stream:
+                    yield audio.frame
+
+        segments = chunk_stream(text, TextChunker(**TTS_CHUNKING))
+        async for frame in synthesize_pipelined(segments, synthesize, max_concurrency=TTS_MAX_CONCURRENCY):
+            yield frame
+
+
+class RealtimeAssistant(Agent):
+    def __init__(self) -> None:
+        super().__init__(instructions=REALTIME_INSTRUCTIONS)
 
 # ----------------- Entrypoint -----------------
 async def entrypoint(ctx: JobContext):
     logger.info("🚀 Entrypoint called — new job received!")
+    job_started = time.perf_counter()
 
-    participant = ctx.job.participant
-    model_name = "gemini-2.5-flash-lite-preview-06-17"
-
-    if participant:
-        logger.info(f"Participant metadata: {participant.metadata}")
-        if participant.metadata:
-            try:
-                metadata = json.loads(participant.metadata)
-                model_name = metadata.get("model", model_name)
-                logger.info(f"Using LLM model from metadata: {model_name}")
-            except json.JSONDecodeError:
-                logger.warning("Could not decode participant metadata")
-        else:
-            logger.warning("Participant metadata is empty, using default model.")
+    model_name = None
+    wire_format = "json"
+    metadata = {}
+
+    # Explicit dispatch (AGENT_NAME set, see server.py) carries the metadata on
+    # the job, automatic dispatch only on the participant's token
+    raw_metadata, source = ctx.job.metadata, "dispatch"
+    if not raw_metadata and ctx.job.participant:
+        raw_metadata, source = ctx.job.participant.metadata, "participant"
+
+    if raw_metadata:
+        logger.info(f"Job metadata ({source}): {raw_metadata}")
+        try:
+            metadata = json.loads(raw_metadata)
+            model_name = metadata.get("model")
+            if metadata.get("wire") == "binary":
+                wire_format = "binary"
+                logger.info("Using binary wire format for agent_metrics")
+        except json.JSONDecodeError:
+            logger.warning(f"Could not decode {source} metadata")
     else:
-        logger.warning("No participant found, using default model.")
+        logger.warning("No job metadata found, using default model.")
+
+    # ----------------- Select Mode -----------------
+    # Native-audio models run in realtime mode, everything else as a pipeline
+    mode, model_name = resolve_mode(model_name, metadata.get("mode"))
+    logger.info(f"Using {mode} mode with model {model_name}")
 
     # ----------------- Initialize VAD -----------------
-    vad = silero.VAD.load(force_cpu=True)
-    vad.update_options(
-        min_speech_duration=0.3,
-        min_silence_duration=1.0,
-        prefix_padding_duration=0.5,
-        max_buffered_speech=60.0,
-        activation_threshold=0.5,
-    )
+    # Plugins are loaded once per process in prewarm(); fall back to loading
+    # them here if the worker was started without a prewarm stage.
+    userdata = ctx.proc.userdata
+    if "vad" not in userdata:
+        logger.warning("Worker was not prewarmed, loading plugins in job")
+        prewarm(ctx.proc)
+
+    # Each job runs in its own process by default, so tuning the shared
+    # instance here only affects this job.
+    if mode == "pipeline":
+        vad_options = resolve_vad_options(metadata)
+        userdata["vad"].update_options(**vad_options)
 
     # ----------------- Initialize Agent Session -----------------
-    session = AgentSession(
-        vad=vad,
-        stt=google.STT(),
-        # llm=google.LLM(model=model_name),
-        llm=google.LLM(
-            model=model_name,
-            gemini_tools="google_search"  # Enable the Google Search tool
-        ),
-        tts=google.TTS(),
-    )
+    # LLM clients come from the per-process pool, see session_factory.py
+    session = create_session(mode, model_name, userdata)
 
     # ----------------- Initialize Usage Collector -----------------
     usage_collector = agent_metrics.UsageCollector()
 
-    # ----------------- Helper to format timestamps -----------------
-    def format_timestamp(ts: float) -> str:
-        try:
-            t = datetime.fromtimestamp(ts / 1000.0)
-            return t.strftime("%H:%M:%S.%f")[:-3]
-        except:
-            return str(ts)
+    # ----------------- Initialize Telemetry Sink -----------------
+    telemetry = None
+    if TELEMETRY_DIR:
+        telemetry = TelemetrySink(
+            TELEMETRY_DIR,
+            prefix=f"{time.strftime('%Y%m%d-%H%M%S')}-{ctx.job.id}",
+            context={"session": ctx.job.id, "room": ctx.job.room.name, "mode": mode, "model": model_name},
+            file_format=TELEMETRY_FORMAT,
+            dropped_counter=exporter.TELEMETRY_DROPPED,
+        )
+        telemetry.start()
 
-    # ----------------- Event Handlers -----------------
-    async def on_vad_state_changed(event):
-        try:
-            data_to_send = json.dumps({"type": "vad_update", "status": event.state.name})
-            await ctx.room.local_participant.publish_data(data_to_send)
-            logger.info(f"🎤 VAD State Changed: {event.state.name}")
-        except Exception as e:
-            logger.error(f"Error in VAD handler: {e}")
+    async def close_telemetry():
+        summary = usage_collector.get_summary()
+        logger.info(f"📊 Session Usage Summary: {summary}")
+        if telemetry is not None:
+            telemetry.record(usage_record(summary, time.perf_counter() - job_started))
+            await telemetry.aclose()
+
+    ctx.add_shutdown_callback(close_telemetry)
+
+    # ----------------- Initialize Data Publisher -----------------
+    publisher = DataPublisher(
+        ctx.room,
+        topic="agent_metrics",
+        flush_interval=0.075,
+        encoding=wire_format,
+        depth_gauge=exporter.PUBLISH_QUEUE_DEPTH,
+    )
+    ctx.add_shutdown_callback(publisher.aclose)
+
+    # ----------------- Initialize Latency Aggregator -----------------
+    session_latency = LatencyAggregator()
+    latency_report_task = asyncio.create_task(
+        report_periodically(session_latency, "Session", interval=LATENCY_REPORT_INTERVAL)
+    )
+
+    async def report_session_latency():
+        latency_report_task.cancel()
+        session_latency.log_summary(f"Session ({mode})")
+
+    ctx.add_shutdown_callback(report_session_latency)
+
+    # ----------------- Track Active Session -----------------
+    exporter.ACTIVE_SESSIONS.inc()
+
+    async def end_active_session():
+        exporter.ACTIVE_SESSIONS.dec()
+
+    ctx.add_shutdown_callback(end_active_session)
+
+    # ----------------- Handler Instrumentation -----------------
+    # Also samples event-loop lag, which feeds the worker load function (see worker.py)
+    instrumentation = SessionInstrumentation(budget=HANDLER_BUDGET, metrics=exporter)
+    instrumentation.start()
+    ctx.add_shutdown_callback(instrumentation.aclose)
+
+    # ----------------- Endpointing -----------------
+    # False cuts and false barge-ins are counted in both endpointing modes
+    endpointing_controller = None
+    if mode == "pipeline" and metadata.get("endpointing", ENDPOINTING_MODE) == "adaptive":
+        endpointing_controller = AdaptiveEndpointing(vad_options, apply=userdata["vad"].update_options)
+        logger.info("Using adaptive endpointing")
+    endpointing = EndpointingMonitor(endpointing_controller, counter=exporter.ENDPOINTING_ERRORS)
+
+    async def close_endpointing():
+        await endpointing.aclose()
+        if endpointing_controller is not None:
+            endpointing_controller.log_summary("Session")
+
+    ctx.add_shutdown_callback(close_endpointing)
+
+    # ----------------- Context Compaction -----------------
+    compactor = None
+    if mode == "pipeline" and metadata.get("compaction", CONTEXT_COMPACTION) != "off":
+        budget = context_budget(model_name, metadata.get("context"))
+
+        def report_compaction(before, after):
+            exporter.CONTEXT_TOKENS.labels(model=model_name, stage="before").observe(before)
+            exporter.CONTEXT_TOKENS.labels(model=model_name, stage="after").observe(after)
+            publisher.publish({
+                "type": "metrics_update",
+                "metric_type": "context",
+                "data": {"tokens_before": before, "tokens_after": after},
+            })
+
+        compactor = ContextCompactor(
+            summarize=llm_summarizer(userdata["clients"].summarizer(SUMMARY_MODEL)),
+            on_compact=report_compaction,
+            **budget,
+        )
+        logger.info(f"Compacting context to {budget['keep_turns']} turns / ~{budget['max_tokens']} tokens")
+
+        async def close_compactor():
+            await compactor.aclose()
+            compactor.log_summary("Session")
+
+        ctx.add_shutdown_callback(close_compactor)
+
+    # ----------------- Speculation -----------------
+    speculator = None
+    if mode == "pipeline" and metadata.get("speculation", SPECULATION_MODE) == "on":
+        speculator = Speculator(counter=exporter.SPECULATION, wasted_counter=exporter.SPECULATION_WASTED_TOKENS)
+        logger.info("Speculating on interim transcripts")
 
-    async def on_metrics_collected(event: MetricsCollectedEvent):
+        async def close_speculator():
+            await speculator.aclose()
+            speculator.log_summary("Session")
+
+        ctx.add_shutdown_callback(close_speculator)
+
+    # ----------------- Event Handlers -----------------
+    def on_metrics_collected(event: MetricsCollectedEvent):
         try:
             metrics_obj = event.metrics
             
@@ -98,11 +449,15 @@ async def entrypoint(ctx: JobContext):
                 logger.debug("📊 Metrics object is None")
                 return
 
-            # Use the built-in log_metrics helper for formatted logging
-            agent_metrics.log_metrics(metrics_obj, logger=logger)
-            
+            # Per-metric lines are debug only, distributions are reported by the aggregator
+            logger.debug(f"📊 {type(metrics_obj).__name__}: {metrics_obj}")
+            session_latency.observe(metrics_obj)
+            exporter.observe_metrics(metrics_obj, model_name, mode)
+
             # Collect for usage summary
             usage_collector.collect(metrics_obj)
+            if telemetry is not None:
+                telemetry.record(metrics_record(metrics_obj))
 
             # Build custom data structure for publishing
             data = {"type": "metrics_update"}
@@ -115,7 +470,7 @@ async def entrypoint(ctx: JobContext):
                     "timestamp": getattr(metrics_obj, "timestamp", None),
                 }
             
-            elif isinstance(metrics_obj, agent_metrics.LLMMetrics):
+            elif isinstance(metrics_obj, LLM_METRICS_TYPES):
                 data["metric_type"] = "llm"
                 data["data"] = {
                     "ttft": getattr(metrics_obj, "ttft", None),
@@ -125,12 +480,6 @@ async def entrypoint(ctx: JobContext):
                     "tokens_per_second": getattr(metrics_obj, "tokens_per_second", None),
                     "timestamp": getattr(metrics_obj, "timestamp", None),
                 }
-                logger.info("=" * 60)
-                logger.info("🤖 LLM METRICS")
-                logger.info(f"   TTFT: {getattr(metrics_obj, 'ttft', 0):.3f}s")
-                logger.info(f"   Total Tokens: {getattr(metrics_obj, 'total_tokens', 0)}")
-                logger.info(f"   Timestamp: {format_timestamp(getattr(metrics_obj, 'timestamp', 0))}")
-                logger.info("=" * 60)
             
             elif isinstance(metrics_obj, agent_metrics.TTSMetrics):
                 data["metric_type"] = "tts"
@@ -139,12 +488,6 @@ async def entrypoint(ctx: JobContext):
                     "audio_duration": getattr(metrics_obj, "audio_duration", None),
                     "timestamp": getattr(metrics_obj, "timestamp", None),
                 }
-                logger.info("=" * 60)
-                logger.info("🔊 TTS METRICS")
-                logger.info(f"   TTFB: {getattr(metrics_obj, 'ttfb', 0):.3f}s")
-                logger.info(f"   Audio Duration: {getattr(metrics_obj, 'audio_duration', 0):.3f}s")
-                logger.info(f"   Timestamp: {format_timestamp(getattr(metrics_obj, 'timestamp', 0))}")
-                logger.info("=" * 60)
             
             elif isinstance(metrics_obj, agent_metrics.VADMetrics):
                 data["metric_type"] = "vad"
@@ -152,94 +495,123 @@ async def entrypoint(ctx: JobContext):
                     "timestamp": getattr(metrics_obj, "timestamp", None),
                     "label": getattr(metrics_obj, "label", None),
                 }
-                # Change logger.info to logger.debug for these lines
-                logger.debug("=" * 60)
-                logger.debug("🎤 VAD METRICS")
-                logger.debug(f"   Label: {getattr(metrics_obj, 'label', 'N/A')}")
-                logger.debug(f"   Timestamp: {format_timestamp(getattr(metrics_obj, 'timestamp', 0))}")
-                logger.debug("=" * 60)
             
             # Check for EOUMetrics (Pipeline version)
-            elif hasattr(agent_metrics, 'PipelineEOUMetrics') and isinstance(metrics_obj, agent_metrics.PipelineEOUMetrics):
+            elif isinstance(metrics_obj, EOU_METRICS_TYPES):
                 data["metric_type"] = "eou"
+                endpointing.on_eou(getattr(metrics_obj, "transcription_delay", None))
                 data["data"] = {
                     "end_of_utterance_delay": getattr(metrics_obj, "end_of_utterance_delay", None),
                     "transcription_delay": getattr(metrics_obj, "transcription_delay", None),
                     "timestamp": getattr(metrics_obj, "timestamp", None),
                 }
-                logger.info("=" * 60)
-                logger.info("⏱️  EOU METRICS")
-                logger.info(f"   End of Utterance Delay: {getattr(metrics_obj, 'end_of_utterance_delay', 0):.3f}s")
-                logger.info(f"   Transcription Delay: {getattr(metrics_obj, 'transcription_delay', 0):.3f}s")
-                logger.info(f"   Timestamp: {format_timestamp(getattr(metrics_obj, 'timestamp', 0))}")
-                logger.info("=" * 60)
-
-            # Publish to room
-            await ctx.room.local_participant.publish_data(
-                json.dumps(data),
-                topic="agent_metrics"
-            )
+
+            # Queue for the next batched packet
+            publisher.publish(data)
             
         except Exception as e:
+            exporter.HANDLER_ERRORS.labels(handler="metrics_collected").inc()
             logger.error(f"Error in metrics handler: {e}", exc_info=True)
 
-    async def on_user_transcript(event):
-        try:
-            transcript = event.transcript
+    # Realtime mode publishes interim and final user transcripts, and each
+    # reply once the model has finished it
+    def on_realtime_transcript(event):
+        publisher.publish({"type": "user_transcript", "is_final": event.is_final, "text": event.transcript})
+
+    def on_realtime_item_added(event):
+        item = event.item
+        if item.type == "message" and item.role == "assistant" and item.text_content:
+            publisher.publish({"type": "agent_chunk", "text": item.text_content})
+
+    def on_conversation_item_added(event):
+        item = event.item
+        if item.type == "message" and item.text_content:
+            telemetry.record({"kind": "transcript", "role": item.role, "text": item.text_content})
+
+    def on_user_state_changed(event):
+        # "speaking", "listening" or "away", merged in the publisher queue
+        publisher.publish({"type": "vad_update", "status": event.new_state.upper()})
+        endpointing.on_user_state(event.new_state)
+        if speculator is not None:
+            speculator.on_user_state(event.new_state)
+
+    def on_agent_state_changed(event):
+        if event.new_state == "speaking":
+            logger.info("🤖 Agent started speaking")
+        if mode == "pipeline":
+            endpointing.on_agent_state(event.new_state)
+
+    def on_user_input_transcribed(event):
+        publisher.publish({
+            "type": "transcript_update",
+            "transcript": event.transcript,
+            "speaker": "user",
+            "is_final": event.is_final,
+        })
+        if event.is_final:
             logger.info("=" * 60)
             logger.info("📝 USER TRANSCRIPT")
-            logger.info(f'   "{transcript}"')
+            logger.info(f'   "{event.transcript}"')
             logger.info("=" * 60)
-            
-            # Publish transcript
-            data = {
-                "type": "transcript_update",
-                "transcript": transcript,
-                "speaker": "user"
-            }
-            await ctx.room.local_participant.publish_data(
-                json.dumps(data),
-                topic="agent_metrics"
-            )
-        except Exception as e:
-            logger.error(f"Error in transcript handler: {e}")
+        endpointing.on_transcript(event.is_final)
+        if speculator is not None:
+            speculator.on_transcript(event.transcript, event.is_final)
 
-    async def on_agent_started_speaking(event):
-        try:
-            logger.info(f"🤖 Agent started speaking")
-        except Exception as e:
-            logger.error(f"Error in agent speaking handler: {e}")
-
-    async def on_track_published(event):
-        try:
-            track = event.track
-            participant = event.participant
-            logger.info(f"🎶 New track published by {participant.identity}, kind: {track.kind}, name: {track.name}")
-        except Exception as e:
-            logger.error(f"Error in track published handler: {e}")
+    # Room event, not a session one: (publication, participant)
+    def on_track_published(publication, participant):
+        logger.info(f"🎶 New track published by {participant.identity}, kind: {publication.kind}, name: {publication.name}")
 
     # ----------------- Register Event Handlers -----------------
-    session.on("vad_state_changed", lambda e: asyncio.create_task(on_vad_state_changed(e)))
-    session.on("metrics_collected", lambda e: asyncio.create_task(on_metrics_collected(e)))
-    session.on("user_transcript_committed", lambda e: asyncio.create_task(on_user_transcript(e)))
-    session.on("agent_started_speaking", lambda e: asyncio.create_task(on_agent_started_speaking(e)))
-    session.on("track_published", lambda e: asyncio.create_task(on_track_published(e)))
+    # Publishing handlers only enqueue, so they run inline instead of spawning tasks.
+    # Async handlers are run as tasks tracked by the instrumentation.
+    instrumentation.register(session, "metrics_collected", on_metrics_collected)
+    if mode == "realtime":
+        instrumentation.register(session, "user_input_transcribed", on_realtime_transcript)
+        instrumentation.register(session, "conversation_item_added", on_realtime_item_added)
+    else:
+        instrumentation.register(session, "user_state_changed", on_user_state_changed)
+        instrumentation.register(session, "user_input_transcribed", on_user_input_transcribed)
+    if telemetry is not None and TELEMETRY_TRANSCRIPTS == "on":
+        instrumentation.register(session, "conversation_item_added", on_conversation_item_added)
+    instrumentation.register(session, "agent_state_changed", on_agent_state_changed)
+    instrumentation.register(ctx.room, "track_published", on_track_published)
 
     # ----------------- Connect to Room -----------------
     await ctx.connect()
+    publisher.start()
 
     # ----------------- Start Session -----------------
-    await session.start(agent=SearchAssistant(), room=ctx.room)
+    if mode == "realtime":
+        await session.start(
+            agent=RealtimeAssistant(),
+            room=ctx.room,
+            room_input_options=RoomInputOptions(
+                noise_cancellation=noise_cancellation.BVC(),
+            ),
+        )
+    else:
+        answer_cache = userdata["answer_cache"] if metadata.get("answer_cache", ANSWER_CACHE_MODE == "on") else None
+        agent = SearchAssistant(model=model_name, answer_cache=answer_cache, compactor=compactor, speculator=speculator)
+        await session.start(agent=agent, room=ctx.room)
+
+    startup = time.perf_counter() - job_started
+    exporter.SESSION_START.labels(mode=mode).observe(startup)
+    logger.info(f"⏱️  {mode} session running {startup * 1000:.0f}ms after job start")
+
+    if mode == "realtime":
+        # The realtime model speaks for itself, there is no TTS to play a welcome clip with
+        return
 
     # ----------------- Send Welcome Message -----------------
-    await session.say(WELCOME_MESSAGE)
+    # Pre-rendered in prewarm, TTS only runs if that failed
+    audio_cache = userdata["audio_cache"]
+    await session.say(WELCOME_MESSAGE, audio=audio_cache.frames(WELCOME_MESSAGE, session.tts, TTS_VOICE))
+    publisher.publish({"type": "metrics_update", "metric_type": "audio_cache", "data": dict(audio_cache.stats)})
     logger.info("✅ Agent session started and welcome message sent")
-    
-    # You can later get usage summary with:
-    # summary = usage_collector.get_summary()
-    # logger.info(f"Session Usage Summary: {summary}")
 
 
 # ----------------- Run Worker -----------------
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint))
\ No newline at end of file
+    metrics_port = exporter.start_metrics_server()
+    logger.info(f"📡 Metrics endpoint listening on :{metrics_port}/metrics")
+    cli.run_app(make_worker_options(entrypoint, prewarm_fnc=prewarm, loop_lag_fn=exporter.current_loop_lag))
\ No newline at end of file
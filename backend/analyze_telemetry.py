@@ -0,0 +1,187 @@
+"""
+Cost and latency breakdown per model from telemetry files (see telemetry.py).
+
+Streams every row once and keeps only per-model aggregates (token and
+character sums, fixed-memory latency sketches), so millions of rows need
+no more memory than a handful. JSON lines are read line by line; Parquet
+files (pyarrow required) are read in record batches of the needed columns.
+
+Cost uses the per-turn llm/tts/stt rows, so sessions that died before
+writing their usage row are still counted. PRICES are list prices in USD
+at the time of writing. Pass --prices with a JSON file of the same shape
+to use your own rates.
+
+Run from the backend directory:
+    python analyze_telemetry.py telemetry/
+    python analyze_telemetry.py telemetry/ --prices prices.json --output report.json
+"""
+import argparse
+import collections
+import json
+import os
+
+from latency import QuantileSketch
+from telemetry import pq
+
+# USD per million tokens (LLM), per million characters (TTS) and per minute (STT)
+PRICES = {
+    "llm": {
+        "gemini-2.5-flash-lite-preview-06-17": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+        "gemini-2.0-flash": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+        "gemini-2.5-flash": {"input": 0.30, "cached_input": 0.075, "output": 2.50},
+        "gemini-2.5-flash-native-audio-preview-09-2025": {"input": 0.50, "cached_input": 0.50, "output": 2.00},
+    },
+    "tts_per_million_chars": 16.0,
+    "stt_per_minute": 0.016,
+}
+
+COLUMNS = [
+    "session", "model", "kind", "ttft", "ttfb", "duration", "prompt_tokens", "prompt_cached_tokens",
+    "completion_tokens", "characters", "stt_audio_duration", "end_of_utterance_delay", "transcription_delay",
+]
+
+
+def telemetry_files(paths: list) -> list:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in names if name.endswith((".jsonl", ".parquet")))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def read_rows(path: str):
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise SystemExit(f"pyarrow is needed to read {path}")
+        for batch in pq.ParquetFile(path).iter_batches(columns=COLUMNS, batch_size=65_536):
+            yield from batch.to_pylist()
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class ModelStats:
+    SERIES = ("llm_ttft", "llm_duration", "tts_ttfb", "eou_delay", "transcription_delay")
+
+    def __init__(self):
+        self.sessions = set()
+        self.rows = 0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.tts_characters = 0
+        self.stt_seconds = 0.0
+        self.sketches = {name: QuantileSketch() for name in self.SERIES}
+
+    def add(self, row: dict):
+        self.rows += 1
+        self.sessions.add(row.get("session"))
+        kind = row.get("kind")
+        if kind == "llm":
+            self.llm_calls += 1
+            self.prompt_tokens += row.get("prompt_tokens") or 0
+            self.cached_tokens += row.get("prompt_cached_tokens") or 0
+            self.completion_tokens += row.get("completion_tokens") or 0
+            self.sketches["llm_ttft"].add(row.get("ttft"))
+            self.sketches["llm_duration"].add(row.get("duration"))
+        elif kind == "tts":
+            self.tts_characters += row.get("characters") or 0
+            self.sketches["tts_ttfb"].add(row.get("ttfb"))
+        elif kind == "stt":
+            self.stt_seconds += row.get("stt_audio_duration") or 0.0
+        elif kind == "eou":
+            self.sketches["eou_delay"].add(row.get("end_of_utterance_delay"))
+            self.sketches["transcription_delay"].add(row.get("transcription_delay"))
+
+    def cost(self, model: str, prices: dict) -> dict:
+        rates = prices["llm"].get(model)
+        uncached = self.prompt_tokens - self.cached_tokens
+        llm = None
+        if rates is not None:
+            llm = (
+                uncached * rates["input"] + self.cached_tokens * rates["cached_input"]
+                + self.completion_tokens * rates["output"]
+            ) / 1e6
+        tts = self.tts_characters * prices["tts_per_million_chars"] / 1e6
+        stt = self.stt_seconds / 60 * prices["stt_per_minute"]
+        total = (llm or 0.0) + tts + stt
+        return {
+            "llm": llm,
+            "tts": tts,
+            "stt": stt,
+            "total": total,
+            "per_session": total / len(self.sessions) if self.sessions else 0.0,
+        }
+
+    def summary(self, model: str, prices: dict) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "rows": self.rows,
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tts_characters": self.tts_characters,
+            "stt_minutes": self.stt_seconds / 60,
+            "cost_usd": self.cost(model, prices),
+            "latency": {name: sketch.summary() for name, sketch in self.sketches.items()},
+        }
+
+
+def report(model: str, s: dict):
+    cost = s["cost_usd"]
+    llm_cost = "n/a (no price)" if cost["llm"] is None else f"${cost['llm']:.4f}"
+    print(f"\n{model}: {s['sessions']} sessions, {s['rows']} rows, {s['llm_calls']} LLM calls")
+    print(
+        f"  tokens  prompt={s['prompt_tokens']} (cached {s['cached_tokens']}) completion={s['completion_tokens']}  "
+        f"tts chars={s['tts_characters']}  stt={s['stt_minutes']:.1f}min"
+    )
+    print(
+        f"  cost    llm={llm_cost} tts=${cost['tts']:.4f} stt=${cost['stt']:.4f}  "
+        f"total=${cost['total']:.4f} (${cost['per_session']:.5f}/session)"
+    )
+    for name, latency in s["latency"].items():
+        if latency["count"]:
+            print(
+                f"  {name:<20} n={latency['count']:<8} p50={latency['p50'] * 1000:7.0f}ms "
+                f"p90={latency['p90'] * 1000:7.0f}ms p99={latency['p99'] * 1000:7.0f}ms"
+            )
+
+
+def main(args):
+    prices = PRICES
+    if args.prices:
+        with open(args.prices) as f:
+            prices = json.load(f)
+
+    files = telemetry_files(args.paths)
+    by_model = collections.defaultdict(ModelStats)
+    rows = 0
+    for path in files:
+        for row in read_rows(path):
+            by_model[row.get("model") or "unknown"].add(row)
+            rows += 1
+    print(f"Read {rows} rows from {len(files)} files")
+
+    results = {model: stats.summary(model, prices) for model, stats in sorted(by_model.items())}
+    for model, summary in results.items():
+        report(model, summary)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved report to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-model cost and latency from telemetry files")
+    parser.add_argument("paths", nargs="+", help="telemetry files or directories")
+    parser.add_argument("--prices", help="JSON file shaped like PRICES")
+    parser.add_argument("--output")
+    main(parser.parse_args())
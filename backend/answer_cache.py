@@ -0,0 +1,92 @@
+import os
+import re
+import sqlite3
+import time
+
+
+def normalize(text: str) -> str:
+    """Lower-case, strip punctuation and collapse whitespace."""
+    text = re.sub(r"[^\w\s']", " ", text.lower())
+    return " ".join(text.split())
+
+
+class AnswerCache:
+    """
+    Answer cache for repeated questions, shared by every job on the host.
+
+    Entries live in a SQLite file at path, so a question answered in one job
+    process can be served to a caller in another. They are keyed by model
+    and normalized question text: a lookup only hits when every word of the
+    question matches, since questions that differ in a single word ("in
+    india" / "in china", "this weekend" / "next weekend") need different
+    answers. The key has no conversation context, so callers must only use
+    it for questions that do not depend on earlier turns.
+
+    Entries expire after ttl seconds; past max_entries the least recently
+    used are dropped. If lookup_counter is given (a Prometheus Counter with
+    a "result" label) hits and misses are counted there too.
+    """
+
+    def __init__(self, path: str, max_entries=1024, ttl=300.0, min_words=3, lookup_counter=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.min_words = min_words
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Opened in prewarm, used from the job's event loop
+        self._db = sqlite3.connect(path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " model TEXT, question TEXT, answer TEXT, expires REAL, last_used REAL,"
+            " PRIMARY KEY (model, question))"
+        )
+        self._lookup_counter = lookup_counter
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def cacheable(self, question: str) -> bool:
+        return len(normalize(question).split()) >= self.min_words
+
+    def get(self, question: str, model: str):
+        """Return a cached answer or None."""
+        key = normalize(question)
+        now = time.time()
+        row = self._db.execute(
+            "SELECT answer FROM answers WHERE model = ? AND question = ? AND expires > ?",
+            (model, key, now),
+        ).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        self._db.execute(
+            "UPDATE answers SET last_used = ? WHERE model = ? AND question = ?", (now, model, key)
+        )
+        return row[0]
+
+    def _count(self, result: str):
+        self.stats[result] += 1
+        if self._lookup_counter is not None:
+            self._lookup_counter.labels(result=result).inc()
+
+    def put(self, question: str, model: str, answer: str, ttl: float = None):
+        now = time.time()
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?)",
+                (model, normalize(question), answer, now + (ttl if ttl is not None else self.ttl), now),
+            )
+            self._db.execute("DELETE FROM answers WHERE expires <= ?", (now,))
+            evicted = self._db.execute(
+                "DELETE FROM answers WHERE rowid IN"
+                " (SELECT rowid FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        self.stats["evictions"] += evicted
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,147 @@
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+from collections import OrderedDict
+
+from livekit import rtc
+
+logger = logging.getLogger("agent")
+
+FRAME_MS = 20
+BYTES_PER_SAMPLE = 2  # int16 PCM
+
+
+class AudioCache:
+    """
+    Content-addressed cache of synthesized speech.
+
+    Entries are keyed by text, voice, sample rate and channel count. Hot
+    entries live in an in-memory LRU bounded by max_bytes; if disk_dir is
+    set every entry is also written there as raw PCM and memory-mapped on
+    load, so other worker processes start with a warm cache. If
+    lookup_counter is given (a Prometheus Counter with a "result" label)
+    hits and misses are counted there too.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, disk_dir=None, lookup_counter=None):
+        self._entries = OrderedDict()
+        self._size = 0
+        self._max_bytes = max_bytes
+        self._disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        self._lookup_counter = lookup_counter
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(text: str, voice: str, sample_rate: int, num_channels: int) -> str:
+        raw = f"{voice}|{sample_rate}|{num_channels}|{text.strip()}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        pcm = self._entries.get(key)
+        if pcm is not None:
+            self._entries.move_to_end(key)
+            return pcm
+        pcm = self._load_from_disk(key)
+        if pcm is not None:
+            self._remember(key, pcm)
+        return pcm
+
+    def put(self, key: str, pcm: bytes):
+        self._remember(key, pcm)
+        if self._disk_dir:
+            asyncio.get_running_loop().run_in_executor(None, self._write_to_disk, key, pcm)
+
+    async def frames(self, text: str, tts, voice: str):
+        """Yield frames for text, from the cache on a hit or through tts on a miss."""
+        key = self.make_key(text, voice, tts.sample_rate, tts.num_channels)
+        pcm = self.get(key)
+        if pcm is not None:
+            self._count("hits")
+            for frame in split_frames(pcm, tts.sample_rate, tts.num_channels):
+                yield frame
+            return
+
+        self._count("misses")
+        chunks = []
+        async with tts.synthesize(text) as stream:
+            async for audio in stream:
+                chunks.append(audio.frame.data.tobytes())
+                yield audio.frame
+        self.put(key, b"".join(chunks))
+
+    async def prerender(self, texts, tts, voice: str) -> int:
+        """Synthesize the texts that are not cached yet, and write them to disk_dir. Returns how many were."""
+        rendered = 0
+        for text in texts:
+            key = self.make_key(text, voice, tts.sample_rate, tts.num_channels)
+            if self.get(key) is not None:
+                continue
+            chunks = []
+            async with tts.synthesize(text) as stream:
+                async for audio in stream:
+                    chunks.append(audio.frame.data.tobytes())
+            pcm = b"".join(chunks)
+            self._remember(key, pcm)
+            if self._disk_dir:
+                self._write_to_disk(key, pcm)
+            rendered += 1
+        return rendered
+
+    def _count(self, result: str):
+        self.stats[result] += 1
+        if self._lookup_counter is not None:
+            self._lookup_counter.labels(result=result).inc()
+
+    def _remember(self, key: str, pcm):
+        if len(pcm) > self._max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        self._entries[key] = pcm
+        self._size += len(pcm)
+        while self._size > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._disk_dir, f"{key}.pcm")
+
+    def _load_from_disk(self, key: str):
+        if not self._disk_dir:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            # ValueError: empty file, cannot be mapped
+            return None
+
+    def _write_to_disk(self, key: str, pcm: bytes):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(pcm)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write audio cache entry {key}: {e}")
+
+
+def split_frames(pcm, sample_rate: int, num_channels: int):
+    """Cut raw int16 PCM into FRAME_MS audio frames."""
+    samples_per_frame = sample_rate * FRAME_MS // 1000
+    frame_bytes = samples_per_frame * num_channels * BYTES_PER_SAMPLE
+    view = memoryview(pcm)
+    for offset in range(0, len(view), frame_bytes):
+        chunk = view[offset:offset + frame_bytes]
+        yield rtc.AudioFrame(
+            data=chunk,
+            sample_rate=sample_rate,
+            num_channels=num_channels,
+            samples_per_channel=len(chunk) // (num_channels * BYTES_PER_SAMPLE),
+        )
@@ -0,0 +1,88 @@
+"""
+Hit rate and latency of the answer cache on a transcript corpus.
+
+The corpus is a text file with one user transcript per line, in call order.
+Misses are charged a simulated grounded-LLM latency, hits their measured
+lookup time. Consecutive questions go to --jobs caches opened on the same
+file, the way calls land on different job processes.
+
+Run from the backend directory:
+    python bench_answer_cache.py --corpus transcripts.txt --jobs 4
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from answer_cache import AnswerCache
+
+SAMPLE_CORPUS = [
+    "What's the weather like today?",
+    "what is the weather like today",
+    "Tell me today's news",
+    "What's the weather like today",
+    "Who won the cricket match yesterday?",
+    "tell me todays news",
+    "What is the weather like today?",
+    "Who won the cricket match yesterday",
+    "How tall is the Eiffel Tower?",
+    "What's the weather like tomorrow?",
+    "Tell me today's top news",
+    "how tall is the eiffel tower",
+    "What's the weather like in India?",
+    "What's the weather like in China?",
+    "Is the museum open this weekend?",
+    "Is the museum open next weekend?",
+]
+
+MODEL = "bench-model"
+
+
+def load_corpus(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def run(corpus: list, args) -> dict:
+    path = os.path.join(tempfile.mkdtemp(prefix="answer-cache-"), "answers.sqlite3")
+    caches = [AnswerCache(path, max_entries=args.max_entries, ttl=args.ttl) for _ in range(args.jobs)]
+    lookup_us = []
+    turn_latency = []
+    for i, question in enumerate(corpus):
+        cache = caches[i % len(caches)]
+        if not cache.cacheable(question):
+            turn_latency.append(args.llm_latency)
+            continue
+        start = time.perf_counter()
+        answer = cache.get(question, MODEL)
+        elapsed = time.perf_counter() - start
+        lookup_us.append(elapsed * 1e6)
+        if answer is None:
+            cache.put(question, MODEL, f"answer to: {question}")
+            turn_latency.append(args.llm_latency + elapsed)
+        else:
+            turn_latency.append(elapsed)
+    return {
+        "questions": len(corpus),
+        "hit_rate": sum(c.stats["hits"] for c in caches) / max(1, len(corpus)),
+        "lookup_us": statistics.mean(lookup_us) if lookup_us else 0.0,
+        "mean_turn_latency": statistics.mean(turn_latency),
+        "evictions": sum(c.stats["evictions"] for c in caches),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer cache benchmark")
+    parser.add_argument("--corpus", help="File with one transcript per line (default: built-in sample)")
+    parser.add_argument("--jobs", type=int, default=4, help="Job processes sharing the cache file")
+    parser.add_argument("--ttl", type=float, default=300.0)
+    parser.add_argument("--max-entries", type=int, default=1024)
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="Simulated grounded LLM latency (s)")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else SAMPLE_CORPUS
+    result = run(corpus, args)
+    print(f"questions={result['questions']}  hit rate={result['hit_rate']:.1%}  evictions={result['evictions']}")
+    print(f"lookup={result['lookup_us']:.1f}us  mean turn latency={result['mean_turn_latency'] * 1000:.0f}ms "
+          f"(no cache: {args.llm_latency * 1000:.0f}ms)")
@@ -0,0 +1,93 @@
+"""
+Time-to-first-audio with and without the chunking stage, using fake LLM/TTS stand-ins.
+
+"streaming" is the session's default path with a streaming TTS (google.TTS
+by default): one stream is opened when the reply starts, so connecting
+(--tts-connect) overlaps with the LLM, and sentences are synthesized in
+order as they complete. The other two are for TTS without streaming, one
+request (and connection) per segment: "sentence" is the default path, whole
+sentences one after another, and "pipelined" is SearchAssistant.tts_node,
+TextChunker with the first-phrase fast path and concurrent synthesis.
+
+Run from the backend directory:
+    python bench_chunking.py --token-delay 0.03 --tts-ttfb 0.2
+"""
+import argparse
+import asyncio
+import time
+
+from chunking import TextChunker, chunk_stream, synthesize_pipelined
+
+ANSWER = (
+    "According to the latest reports, the weather in Pune today is mostly sunny, "
+    "with a high of 31 degrees and a light breeze from the west. "
+    "There is a small chance of showers in the evening, so you might want to carry an umbrella. "
+    "Tomorrow looks similar, with slightly cooler temperatures in the morning."
+)
+
+
+async def fake_llm(token_delay: float):
+    for word in ANSWER.split(" "):
+        await asyncio.sleep(token_delay)
+        yield word + " "
+
+
+def fake_tts(ttfb: float, chars_per_second: float, frame_ms: int = 20):
+    async def synthesize(segment: str):
+        await asyncio.sleep(ttfb)
+        audio_seconds = len(segment) / chars_per_second
+        frames = max(1, int(audio_seconds * 1000 / frame_ms))
+        # Synthesis runs ~4x faster than real time
+        for _ in range(frames):
+            await asyncio.sleep(frame_ms / 4000)
+            yield frame_ms
+
+    return synthesize
+
+
+async def fake_streaming_tts(segments, ttfb: float, connect: float, chars_per_second: float, frame_ms: int = 20):
+    connected = asyncio.create_task(asyncio.sleep(connect))
+    async for segment in segments:
+        await connected
+        await asyncio.sleep(ttfb - connect)
+        frames = max(1, int(len(segment) / chars_per_second * 1000 / frame_ms))
+        for _ in range(frames):
+            await asyncio.sleep(frame_ms / 4000)
+            yield frame_ms
+
+
+async def measure(mode: str, args) -> dict:
+    synthesize = fake_tts(args.tts_ttfb, args.chars_per_second)
+    start = time.perf_counter()
+    first_audio = None
+    sentences = TextChunker(min_chars=1, max_chars=10_000, fast_first=False)
+    if mode == "streaming":
+        segments = chunk_stream(fake_llm(args.token_delay), sentences)
+        frames = fake_streaming_tts(segments, args.tts_ttfb, args.tts_connect, args.chars_per_second)
+    elif mode == "sentence":
+        segments = chunk_stream(fake_llm(args.token_delay), sentences)
+        frames = synthesize_pipelined(segments, synthesize, max_concurrency=1)
+    else:
+        segments = chunk_stream(fake_llm(args.token_delay), TextChunker())
+        frames = synthesize_pipelined(segments, synthesize, max_concurrency=args.concurrency)
+
+    async for _ in frames:
+        if first_audio is None:
+            first_audio = time.perf_counter() - start
+    return {"ttfa": first_audio, "total": time.perf_counter() - start}
+
+
+async def main(args):
+    for mode in ("streaming", "sentence", "pipelined"):
+        result = await measure(mode, args)
+        print(f"{mode:<10} time-to-first-audio={result['ttfa'] * 1000:7.1f}ms  total={result['total'] * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TTS chunking benchmark")
+    parser.add_argument("--token-delay", type=float, default=0.03)
+    parser.add_argument("--tts-ttfb", type=float, default=0.2)
+    parser.add_argument("--tts-connect", type=float, default=0.1, help="part of --tts-ttfb paid once per request or stream")
+    parser.add_argument("--chars-per-second", type=float, default=15.0)
+    parser.add_argument("--concurrency", type=int, default=2)
+    asyncio.run(main(parser.parse_args()))
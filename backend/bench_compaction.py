@@ -0,0 +1,76 @@
+"""
+Estimated LLM prompt tokens per turn on a long call, with and without
+context compaction.
+
+Builds a chat history the way the session does: instructions, then one user
+question and one spoken answer per turn. With --tool-results, each turn also
+has a search call and its result payload. Before every turn the history goes
+through a ContextCompactor with the budget of --model. The summarizer is a
+stand-in that keeps the tail of its input after --summary-delay, so no
+model is called. The stand-in is roughly the size of a real summary.
+
+Run from the backend directory:
+    python bench_compaction.py --turns 40
+"""
+import argparse
+import asyncio
+import json
+
+from livekit.agents.llm import ChatContext, FunctionCall, FunctionCallOutput
+
+from compaction import ContextCompactor, context_budget, estimate_tokens
+from prompts import INSTRUCTIONS
+from session_factory import DEFAULT_PIPELINE_MODEL
+
+QUESTION = "what is the weather in pune today and will it rain this evening"
+ANSWER = (
+    "According to the latest reports, the weather in Pune today is mostly sunny, "
+    "with a high of 31 degrees and a light breeze from the west. "
+    "There is a small chance of showers in the evening, so you might want to carry an umbrella."
+)
+SEARCH_RESULT = json.dumps([
+    {"title": f"Pune weather report {i}", "snippet": ANSWER, "url": f"https://example.com/weather/{i}"}
+    for i in range(5)
+])
+
+
+async def run(args):
+    budget = context_budget(args.model)
+
+    async def summarize(summary, transcript):
+        await asyncio.sleep(args.summary_delay)
+        return (summary + " " + transcript)[-600:]
+
+    compactor = ContextCompactor(summarize=summarize, **budget)
+    chat_ctx = ChatContext.empty()
+    chat_ctx.add_message(role="system", content=INSTRUCTIONS)
+    print(f"{args.model}: keep {budget['keep_turns']} turns, ~{budget['max_tokens']} token budget")
+    for turn in range(1, args.turns + 1):
+        chat_ctx.add_message(role="user", content=f"{QUESTION} ({turn})")
+        if args.tool_results:
+            call_id = f"call_{turn}"
+            chat_ctx.items.append(FunctionCall(call_id=call_id, name="search", arguments=json.dumps({"query": QUESTION})))
+            chat_ctx.items.append(FunctionCallOutput(call_id=call_id, name="search", output=SEARCH_RESULT, is_error=False))
+        full = estimate_tokens(chat_ctx.items)
+        compacted = compactor.compact(chat_ctx)
+        chat_ctx.add_message(role="assistant", content=ANSWER)
+        compactor.summarize_later()
+        # The user takes a moment to ask the next question
+        await asyncio.sleep(args.summary_delay * 2)
+        if turn in args.report or turn == args.turns:
+            print(
+                f"  turn {turn:>3}: full ~{full:>6} tokens  "
+                f"compacted ~{estimate_tokens(compacted.items):>5} tokens ({len(compacted.items)} items)"
+            )
+    await compactor.aclose()
+    print(f"  {compactor.stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Context compaction benchmark")
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--report", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--model", default=DEFAULT_PIPELINE_MODEL)
+    parser.add_argument("--summary-delay", type=float, default=0.01)
+    parser.add_argument("--tool-results", action="store_true", help="add a search call and its payload to every turn")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,140 @@
+"""
+Render count and time per update of the Streamlit chat, before and after
+the incremental conversation store.
+
+"rerun" mimics the old client: every packet is decoded on the rerun path,
+applied to a list of dicts and the whole history is drawn again.
+"store" applies packets to a ConversationStore as they arrive and draws the
+last --window messages once per --frame-budget, like the chat fragment in
+ui.py. Streamlit drops whatever a fragment run does not draw, so frames
+with nothing new are drawn in full too, from the last snapshot; they are
+counted as renders and reported separately as idle.
+
+Packets follow a simulated call (interim user transcripts, then the answer
+streamed as agent chunks every --chunk-interval seconds) on a virtual clock,
+so the run takes no wall time beyond the work itself. Drawing a message is
+stood in for by serializing it the way Streamlit ships an element.
+
+Run from the backend directory:
+    python bench_conversation.py --turns 10 50 200
+"""
+import argparse
+import json
+import time
+
+from conversation import ConversationStore
+
+QUESTION = "what is the weather in pune today and will it rain this evening"
+ANSWER = (
+    "According to the latest reports, the weather in Pune today is mostly sunny, "
+    "with a high of 31 degrees and a light breeze from the west. "
+    "There is a small chance of showers in the evening, so you might want to carry an umbrella."
+)
+
+
+def simulated_call(turns: int, chunk_interval: float) -> list:
+    """[(time, packet bytes), ...] for a call with the given number of turns."""
+    packets = []
+    now = 0.0
+    words = QUESTION.split()
+    answer = ANSWER.split(" ")
+    for _ in range(turns):
+        for i in range(2, len(words) + 1, 2):
+            now += 0.3
+            packets.append((now, {"type": "user_transcript", "text": " ".join(words[:i]), "is_final": False}))
+        now += 0.3
+        packets.append((now, {"type": "user_transcript", "text": QUESTION, "is_final": True}))
+        now += 0.8
+        for word in answer:
+            now += chunk_interval
+            packets.append((now, {"type": "agent_chunk", "text": word + " "}))
+        now += 2.0
+    return [(t, json.dumps(payload).encode("utf-8")) for t, payload in packets]
+
+
+def draw(role: str, text: str) -> int:
+    return len(json.dumps({"chat_message": role, "markdown": text}))
+
+
+def run_rerun(packets: list) -> dict:
+    messages = []
+    render_time = 0.0
+    for _, data in packets:
+        start = time.perf_counter()
+        payload = json.loads(data.decode("utf-8"))
+        if payload["type"] == "user_transcript":
+            if messages and messages[-1]["role"] == "user":
+                messages[-1].update({"content": payload["text"], "is_final": payload["is_final"]})
+            else:
+                messages.append({"role": "user", "content": payload["text"], "is_final": payload["is_final"]})
+        elif messages and messages[-1]["role"] == "assistant":
+            messages[-1]["content"] += payload["text"]
+        else:
+            messages.append({"role": "assistant", "content": payload["text"]})
+        for msg in messages:
+            content = msg["content"]
+            if msg["role"] == "user" and not msg.get("is_final", True):
+                content += "..."
+            draw(msg["role"], content)
+        render_time += time.perf_counter() - start
+    return {"renders": len(packets), "idle": 0, "render_time": render_time, "apply_time": 0.0}
+
+
+def run_store(packets: list, frame_budget: float, window: int) -> dict:
+    store = ConversationStore()
+    renders = idle = 0
+    render_time = apply_time = 0.0
+    next_frame = frame_budget
+    drawn_version = -1
+    snapshot = None
+    end = packets[-1][0] + frame_budget
+
+    def render():
+        nonlocal renders, render_time, drawn_version, snapshot
+        start = time.perf_counter()
+        if store.version != drawn_version:
+            drawn_version = store.version
+            snapshot = store.window(window)
+        hidden, shown = snapshot
+        for _, role, text, is_final, _ in shown:
+            draw(role, text if is_final else text + "...")
+        render_time += time.perf_counter() - start
+        renders += 1
+
+    i = 0
+    while next_frame <= end:
+        while i < len(packets) and packets[i][0] <= next_frame:
+            start = time.perf_counter()
+            store.apply(json.loads(packets[i][1].decode("utf-8")))
+            apply_time += time.perf_counter() - start
+            i += 1
+        if store.version == drawn_version:
+            idle += 1
+        render()
+        next_frame += frame_budget
+    return {"renders": renders, "idle": idle, "render_time": render_time, "apply_time": apply_time}
+
+
+def main(args):
+    for turns in args.turns:
+        packets = simulated_call(turns, args.chunk_interval)
+        print(f"\n{turns} turns, {len(packets)} packets over {packets[-1][0]:.0f}s of call")
+        for mode, result in (
+            ("rerun", run_rerun(packets)),
+            ("store", run_store(packets, args.frame_budget, args.window)),
+        ):
+            per_update = (result["render_time"] + result["apply_time"]) / len(packets)
+            print(
+                f"  {mode:<6} renders={result['renders']:<6} (idle {result['idle']:<6}) "
+                f"render={result['render_time'] * 1000:8.1f}ms "
+                f"apply={result['apply_time'] * 1000:6.1f}ms  per update={per_update * 1e6:7.1f}us"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat rendering benchmark")
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--chunk-interval", type=float, default=0.03)
+    parser.add_argument("--frame-budget", type=float, default=0.1)
+    parser.add_argument("--window", type=int, default=50)
+    main(parser.parse_args())
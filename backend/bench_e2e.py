@@ -0,0 +1,595 @@
+"""
+Offline end-to-end latency benchmark for the pipeline agent.
+
+Runs real AgentSessions with the SearchAssistant from agent.py, but with
+local stand-ins for everything that normally needs LiveKit or Google:
+
+    RecordedMic    audio input fed from a PCM/WAV recording in real time
+    FakeSpeaker    audio output that "plays" frames in real time and records
+                   when the first frame arrived and when playback was cleared
+    FakeVAD        energy-based VAD using the agent's VAD_DEFAULTS timings
+    FakeSTT        streaming STT that detects speech by energy and emits
+                   interim/final transcripts after a configurable delay
+    FakeLLM        streams a fixed answer with configurable TTFT and token rate
+    FakeTTS        returns silence after a configurable TTFB, without streaming
+                   (so replies go through the chunking tts_node)
+
+Each session plays two user turns. The first is answered in full; during the
+answer to the second the user talks over the agent. Reported per concurrency
+level:
+
+    turn_latency     user stops speaking -> first agent audio frame
+    ttfa             final transcript -> first agent audio frame
+    interrupt        user starts talking over the agent -> playback cleared
+    cpu / rss        process CPU time and resident memory per session
+
+With --speculation the SearchAssistant starts its answer on interim
+transcripts (see speculation.py) and the speculation stats are reported;
+raise --llm-ttft to see the effect of a slow grounded LLM.
+
+Results are written as JSON; with --baseline the run is compared against a
+previous result and exits non-zero when a p50/p90 regresses by more than
+--tolerance.
+
+Run from the backend directory:
+    python bench_e2e.py --sessions 1 10 100 --output bench_e2e_baseline.json
+    python bench_e2e.py --audio question.wav --baseline bench_e2e_baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import wave
+
+import numpy as np
+import psutil
+from livekit import rtc
+from livekit.agents import APIConnectOptions, AgentSession, llm, stt, tts, utils, vad
+from livekit.agents.voice import io
+
+from agent import VAD_DEFAULTS, SearchAssistant
+from speculation import Speculator
+from latency import QuantileSketch
+
+SAMPLE_RATE = 16000
+FRAME_MS = 10
+SAMPLES_PER_FRAME = SAMPLE_RATE * FRAME_MS // 1000
+# Int16 RMS above which a frame counts as speech
+SPEECH_RMS = 500.0
+# FakeVAD reports an inference every this many frames, like silero's 32ms windows
+VAD_WINDOW_FRAMES = 3
+
+QUESTIONS = [
+    "what is the weather in pune today",
+    "who won the cricket match yesterday",
+]
+ANSWER = (
+    "According to the latest reports, the weather in Pune today is mostly sunny, "
+    "with a high of 31 degrees and a light breeze from the west."
+)
+
+
+# ----------------- Audio -----------------
+def load_pcm(path: str) -> np.ndarray:
+    """Read a 16-bit mono WAV file (or raw 16 kHz 16-bit PCM) into int16 samples."""
+    if path.endswith(".wav"):
+        with wave.open(path, "rb") as f:
+            if f.getsampwidth() != 2 or f.getnchannels() != 1:
+                raise ValueError(f"{path}: expected 16-bit mono audio")
+            if f.getframerate() != SAMPLE_RATE:
+                raise ValueError(f"{path}: expected {SAMPLE_RATE} Hz audio")
+            return np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+    with open(path, "rb") as f:
+        return np.frombuffer(f.read(), dtype=np.int16)
+
+
+def synthetic_utterance(seconds: float = 1.5, seed: int = 0) -> np.ndarray:
+    """Speech-like stand-in: a syllable-rate modulated tone with some noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+    signal = np.sin(2 * np.pi * 180 * t) + 0.3 * rng.standard_normal(t.size)
+    return (envelope * signal * 6000).astype(np.int16)
+
+
+def is_loud(frame: rtc.AudioFrame) -> bool:
+    samples = np.frombuffer(frame.data, dtype=np.int16).astype(np.float32)
+    return samples.size > 0 and float(np.sqrt(np.mean(samples ** 2))) > SPEECH_RMS
+
+
+def to_frames(samples: np.ndarray) -> list:
+    padded = np.pad(samples, (0, -samples.size % SAMPLES_PER_FRAME))
+    return [
+        rtc.AudioFrame(chunk.tobytes(), SAMPLE_RATE, 1, SAMPLES_PER_FRAME)
+        for chunk in padded.reshape(-1, SAMPLES_PER_FRAME)
+    ]
+
+
+class RecordedMic(io.AudioInput):
+    """Microphone stand-in: yields one frame every FRAME_MS, silence unless a recording is queued."""
+
+    def __init__(self):
+        super().__init__(label="RecordedMic")
+        self._queue = []
+        self._silence = rtc.AudioFrame(bytes(SAMPLES_PER_FRAME * 2), SAMPLE_RATE, 1, SAMPLES_PER_FRAME)
+        self._next = None
+        self._closed = False
+        self.speech_started_at = None
+        self.speech_ended_at = None
+
+    def play(self, frames: list):
+        self._queue.extend(frames)
+
+    def close(self):
+        self._closed = True
+
+    async def __anext__(self) -> rtc.AudioFrame:
+        if self._closed:
+            raise StopAsyncIteration
+        now = time.perf_counter()
+        self._next = now if self._next is None else self._next + FRAME_MS / 1000
+        if self._next > now:
+            await asyncio.sleep(self._next - now)
+        if self._queue:
+            if self.speech_started_at is None:
+                self.speech_started_at = time.perf_counter()
+            frame = self._queue.pop(0)
+            if not self._queue:
+                self.speech_ended_at = time.perf_counter()
+            return frame
+        return self._silence
+
+
+class FakeSpeaker(io.AudioOutput):
+    """Audio output stand-in that plays captured frames in real time."""
+
+    def __init__(self):
+        super().__init__(label="FakeSpeaker", capabilities=io.AudioOutputCapabilities(pause=False))
+        self.first_frame_at = None
+        self.cleared_at = None
+        self._buffered = 0.0
+        self._started = None
+        self._finish_task = None
+
+    @property
+    def playing(self) -> bool:
+        return self._started is not None
+
+    async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+        await super().capture_frame(frame)
+        if self._started is None:
+            self._started = time.perf_counter()
+            self._buffered = 0.0
+            if self.first_frame_at is None:
+                self.first_frame_at = self._started
+            self.on_playback_started(created_at=time.time())
+        self._buffered += frame.duration
+
+    def flush(self) -> None:
+        super().flush()
+        if self._started is None:
+            return
+        remaining = self._buffered - (time.perf_counter() - self._started)
+        self._finish_task = asyncio.create_task(self._finish(max(0.0, remaining)))
+
+    async def _finish(self, delay: float):
+        await asyncio.sleep(delay)
+        self._end(interrupted=False)
+
+    def clear_buffer(self) -> None:
+        if self._started is None:
+            return
+        if self.cleared_at is None:
+            self.cleared_at = time.perf_counter()
+        if self._finish_task is not None:
+            self._finish_task.cancel()
+        self._end(interrupted=True)
+
+    def _end(self, interrupted: bool):
+        if self._started is None:
+            return
+        position = min(self._buffered, time.perf_counter() - self._started)
+        self._started = None
+        self._finish_task = None
+        self.on_playback_finished(playback_position=position, interrupted=interrupted)
+
+    def reset_turn(self):
+        self.first_frame_at = None
+        self.cleared_at = None
+
+
+# ----------------- Fake plugins -----------------
+class FakeVAD(vad.VAD):
+    def __init__(self, min_speech_duration: float, min_silence_duration: float):
+        super().__init__(capabilities=vad.VADCapabilities(update_interval=VAD_WINDOW_FRAMES * FRAME_MS / 1000))
+        self.min_speech_duration = min_speech_duration
+        self.min_silence_duration = min_silence_duration
+
+    def stream(self) -> "FakeVADStream":
+        return FakeVADStream(self)
+
+
+class FakeVADStream(vad.VADStream):
+    async def _main_task(self) -> None:
+        fake = self._vad
+        speaking = False
+        speech = silence = 0.0
+        samples_index = 0
+        window = []
+        async for frame in self._input_ch:
+            if isinstance(frame, self._FlushSentinel):
+                speaking, speech, silence, window = False, 0.0, 0.0, []
+                continue
+            window.append(frame)
+            if len(window) < VAD_WINDOW_FRAMES:
+                continue
+            duration = sum(f.duration for f in window)
+            samples_index += sum(f.samples_per_channel for f in window)
+            loud = any(is_loud(f) for f in window)
+            if loud:
+                speech += duration
+                silence = 0.0
+            else:
+                silence += duration
+                if not speaking:
+                    speech = 0.0
+
+            def event(type, **kwargs):
+                self._event_ch.send_nowait(vad.VADEvent(
+                    type=type,
+                    samples_index=samples_index,
+                    timestamp=time.time(),
+                    speech_duration=speech,
+                    silence_duration=silence,
+                    speaking=speaking,
+                    raw_accumulated_speech=speech,
+                    raw_accumulated_silence=silence,
+                    **kwargs,
+                ))
+
+            event(vad.VADEventType.INFERENCE_DONE, frames=window, probability=1.0 if loud else 0.0)
+            if not speaking and speech >= fake.min_speech_duration:
+                speaking = True
+                event(vad.VADEventType.START_OF_SPEECH)
+            elif speaking and silence >= fake.min_silence_duration:
+                speaking = False
+                event(vad.VADEventType.END_OF_SPEECH)
+                speech = 0.0
+            window = []
+
+
+class FakeSTT(stt.STT):
+    """Energy-based streaming STT returning scripted transcripts."""
+
+    def __init__(self, transcripts: list, final_delay: float, endpoint_silence: float, interim_interval: float):
+        super().__init__(capabilities=stt.STTCapabilities(streaming=True, interim_results=True))
+        self._transcripts = list(transcripts)
+        self.final_delay = final_delay
+        self.endpoint_silence = endpoint_silence
+        self.interim_interval = interim_interval
+        self.final_at = []
+
+    def next_transcript(self) -> str:
+        return self._transcripts.pop(0) if self._transcripts else "and one more thing"
+
+    async def _recognize_impl(self, buffer, *, language=None, conn_options=None):
+        raise NotImplementedError("FakeSTT only supports streaming")
+
+    def stream(self, *, language=None, conn_options: APIConnectOptions = None) -> "FakeSTTStream":
+        return FakeSTTStream(stt=self, conn_options=conn_options or APIConnectOptions())
+
+
+class FakeSTTStream(stt.RecognizeStream):
+    def _event(self, type, text=""):
+        alternatives = [stt.SpeechData(language="en", text=text)] if text or type != stt.SpeechEventType.START_OF_SPEECH else []
+        self._event_ch.send_nowait(stt.SpeechEvent(type=type, alternatives=alternatives))
+
+    async def _run(self) -> None:
+        fake = self._stt
+        speaking = False
+        transcript = ""
+        speech_time = silence_time = last_interim = 0.0
+        async for frame in self._input_ch:
+            if isinstance(frame, self._FlushSentinel):
+                continue
+            if is_loud(frame):
+                silence_time = 0.0
+                if not speaking:
+                    speaking = True
+                    transcript = fake.next_transcript()
+                    speech_time = last_interim = 0.0
+                    self._event(stt.SpeechEventType.START_OF_SPEECH)
+                speech_time += frame.duration
+                if speech_time - last_interim >= fake.interim_interval:
+                    last_interim = speech_time
+                    words = transcript.split()
+                    heard = max(1, int(len(words) * min(1.0, speech_time / 1.5)))
+                    self._event(stt.SpeechEventType.INTERIM_TRANSCRIPT, " ".join(words[:heard]))
+            elif speaking:
+                silence_time += frame.duration
+                if silence_time >= fake.endpoint_silence:
+                    speaking = False
+                    asyncio.ensure_future(self._finalize(transcript))
+
+    async def _finalize(self, transcript: str):
+        await asyncio.sleep(self._stt.final_delay)
+        self._stt.final_at.append(time.perf_counter())
+        self._event(stt.SpeechEventType.FINAL_TRANSCRIPT, transcript)
+        self._event(stt.SpeechEventType.END_OF_SPEECH)
+
+
+class FakeLLM(llm.LLM):
+    def __init__(self, ttft: float, token_delay: float, answer: str = ANSWER):
+        super().__init__()
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.answer = answer
+
+    def chat(self, *, chat_ctx, tools=None, conn_options: APIConnectOptions = None, **kwargs) -> "FakeLLMStream":
+        return FakeLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options or APIConnectOptions())
+
+
+class FakeLLMStream(llm.LLMStream):
+    async def _run(self) -> None:
+        fake = self._llm
+        request_id = utils.shortuuid()
+        await asyncio.sleep(fake.ttft)
+        words = fake.answer.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(fake.token_delay)
+            self._event_ch.send_nowait(llm.ChatChunk(
+                id=request_id,
+                delta=llm.ChoiceDelta(role="assistant", content=word + " "),
+            ))
+        self._event_ch.send_nowait(llm.ChatChunk(
+            id=request_id,
+            usage=llm.CompletionUsage(completion_tokens=len(words), prompt_tokens=50, total_tokens=50 + len(words)),
+        ))
+
+
+class FakeTTS(tts.TTS):
+    def __init__(self, ttfb: float, chars_per_second: float, realtime_factor: float):
+        super().__init__(capabilities=tts.TTSCapabilities(streaming=False), sample_rate=24000, num_channels=1)
+        self.ttfb = ttfb
+        self.chars_per_second = chars_per_second
+        self.realtime_factor = realtime_factor
+
+    def synthesize(self, text: str, *, conn_options: APIConnectOptions = None) -> "FakeChunkedStream":
+        return FakeChunkedStream(tts=self, input_text=text, conn_options=conn_options or APIConnectOptions())
+
+
+class FakeChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        fake = self._tts
+        output_emitter.initialize(
+            request_id=utils.shortuuid(), sample_rate=fake.sample_rate, num_channels=1, mime_type="audio/pcm"
+        )
+        await asyncio.sleep(fake.ttfb)
+        seconds = len(self._input_text) / fake.chars_per_second
+        chunk = bytes(int(fake.sample_rate * 0.1) * 2)  # 100ms of silence
+        for _ in range(max(1, int(seconds * 10))):
+            output_emitter.push(chunk)
+            await asyncio.sleep(0.1 / fake.realtime_factor)
+        output_emitter.flush()
+
+
+# ----------------- Session driver -----------------
+def elapsed(start, end):
+    return None if start is None or end is None else end - start
+
+
+async def wait_for(condition, timeout: float, poll: float = 0.01) -> bool:
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        await asyncio.sleep(poll)
+    return True
+
+
+async def run_session(utterance: np.ndarray, args) -> dict:
+    fake_stt = FakeSTT(QUESTIONS, args.stt_delay, args.endpoint_silence, args.interim_interval)
+    session = AgentSession(
+        vad=FakeVAD(VAD_DEFAULTS["min_speech_duration"], VAD_DEFAULTS["min_silence_duration"]),
+        stt=fake_stt,
+        llm=FakeLLM(args.llm_ttft, args.token_delay),
+        tts=FakeTTS(args.tts_ttfb, args.chars_per_second, args.tts_realtime_factor),
+        # The default on the pinned livekit-agents release; newer ones try a hosted turn detector
+        turn_detection="vad",
+    )
+    mic, speaker = RecordedMic(), FakeSpeaker()
+    session.input.audio = mic
+    session.output.audio = speaker
+    result = {"turn_latency": [], "ttfa": [], "interrupt": [], "timeouts": 0}
+
+    speculator = None
+    if args.speculation:
+        speculator = Speculator()
+        session.on("user_state_changed", lambda event: speculator.on_user_state(event.new_state))
+        session.on("user_input_transcribed", lambda event: speculator.on_transcript(event.transcript, event.is_final))
+    await session.start(agent=SearchAssistant(speculator=speculator))
+    try:
+        frames = to_frames(utterance)
+        for turn in range(2):
+            speaker.reset_turn()
+            mic.speech_started_at = mic.speech_ended_at = None
+            finals = len(fake_stt.final_at)
+            mic.play(frames)
+            if not await wait_for(lambda: speaker.first_frame_at is not None, args.turn_timeout):
+                result["timeouts"] += 1
+                continue
+            result["turn_latency"].append(elapsed(mic.speech_ended_at, speaker.first_frame_at))
+            if len(fake_stt.final_at) > finals:
+                result["ttfa"].append(elapsed(fake_stt.final_at[finals], speaker.first_frame_at))
+
+            if turn == 0:
+                # Let the answer play out before the next question
+                await wait_for(lambda: not speaker.playing, args.turn_timeout)
+                await asyncio.sleep(0.3)
+            else:
+                # Talk over the answer
+                await asyncio.sleep(args.barge_in_after)
+                barge_in_at = time.perf_counter()
+                mic.play(frames)
+                if await wait_for(lambda: speaker.cleared_at is not None, args.turn_timeout):
+                    result["interrupt"].append(speaker.cleared_at - barge_in_at)
+                else:
+                    result["timeouts"] += 1
+    finally:
+        mic.close()
+        await session.aclose()
+        if speculator is not None:
+            await speculator.aclose()
+            result["speculation"] = speculator.stats
+    return result
+
+
+async def run_level(sessions: int, utterance: np.ndarray, args) -> dict:
+    process = psutil.Process()
+    cpu_before = process.cpu_times()
+    rss_before = process.memory_info().rss
+    peak_rss = rss_before
+    start = time.perf_counter()
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while True:
+            peak_rss = max(peak_rss, process.memory_info().rss)
+            await asyncio.sleep(0.1)
+
+    sampler = asyncio.create_task(sample_rss())
+    # Stagger starts a little, like real callers
+    async def staggered(i):
+        await asyncio.sleep(i * args.stagger)
+        return await run_session(utterance, args)
+
+    results = await asyncio.gather(*(staggered(i) for i in range(sessions)), return_exceptions=True)
+    sampler.cancel()
+    wall = time.perf_counter() - start
+    cpu_after = process.cpu_times()
+    cpu = (cpu_after.user - cpu_before.user) + (cpu_after.system - cpu_before.system)
+
+    sketches = {name: QuantileSketch() for name in ("turn_latency", "ttfa", "interrupt")}
+    errors = timeouts = 0
+    speculation = {}
+    for result in results:
+        if isinstance(result, Exception):
+            errors += 1
+            logging.getLogger("agent").error(f"Session failed: {result!r}")
+            continue
+        timeouts += result["timeouts"]
+        for key, value in result.get("speculation", {}).items():
+            speculation[key] = speculation.get(key, 0) + value
+        for name, sketch in sketches.items():
+            for value in result[name]:
+                sketch.add(value)
+
+    level = {name: sketch.summary() for name, sketch in sketches.items()}
+    level.update({
+        "sessions": sessions,
+        "errors": errors,
+        "timeouts": timeouts,
+        "wall_seconds": wall,
+        "cpu_seconds_per_session": cpu / sessions,
+        "cpu_utilization": cpu / wall,
+        "peak_rss_mb_per_session": (peak_rss - rss_before) / sessions / 2**20,
+    })
+    if speculation:
+        level["speculation"] = speculation
+    return level
+
+
+def report(level: dict):
+    print(f"\n{level['sessions']} concurrent session(s)  errors={level['errors']} timeouts={level['timeouts']}")
+    for name in ("turn_latency", "ttfa", "interrupt"):
+        s = level[name]
+        if s["count"] == 0:
+            print(f"  {name:<13} no samples")
+            continue
+        print(
+            f"  {name:<13} n={s['count']:<4} p50={s['p50'] * 1000:7.1f}ms "
+            f"p90={s['p90'] * 1000:7.1f}ms max={s['max'] * 1000:7.1f}ms"
+        )
+    print(
+        f"  cpu={level['cpu_seconds_per_session'] * 1000:.0f}ms/session "
+        f"({level['cpu_utilization'] * 100:.0f}% of a core)  "
+        f"peak rss=+{level['peak_rss_mb_per_session']:.2f}MB/session"
+    )
+    if "speculation" in level:
+        print(f"  speculation {level['speculation']}")
+
+
+def compare(results: dict, baseline_path: str, tolerance: float) -> list:
+    """Return a description of every p50/p90 that regressed past tolerance."""
+    with open(baseline_path) as f:
+        baseline = {level["sessions"]: level for level in json.load(f)["levels"]}
+    regressions = []
+    for level in results["levels"]:
+        old = baseline.get(level["sessions"])
+        if old is None:
+            continue
+        for name in ("turn_latency", "ttfa", "interrupt"):
+            for q in ("p50", "p90"):
+                before, after = old[name].get(q), level[name].get(q)
+                if before and after and after > before * (1 + tolerance):
+                    regressions.append(
+                        f"{level['sessions']} sessions {name} {q}: {before * 1000:.1f}ms -> {after * 1000:.1f}ms"
+                    )
+    return regressions
+
+
+async def main(args):
+    utterance = load_pcm(args.audio) if args.audio else synthetic_utterance()
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"python": platform.python_version(), "cpus": os.cpu_count()},
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "levels": [],
+    }
+    for sessions in args.sessions:
+        level = await run_level(sessions, utterance, args)
+        report(level)
+        results["levels"].append(level)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end agent latency benchmark")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--audio", help="16 kHz 16-bit mono WAV or raw PCM of one user question")
+    parser.add_argument("--output", default="bench_e2e_results.json")
+    parser.add_argument("--baseline", help="previous results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative p50/p90 increase")
+    parser.add_argument("--stt-delay", type=float, default=0.15, help="endpoint to final transcript")
+    parser.add_argument("--endpoint-silence", type=float, default=0.3, help="silence that ends an utterance")
+    parser.add_argument("--interim-interval", type=float, default=0.3)
+    parser.add_argument("--llm-ttft", type=float, default=0.4)
+    parser.add_argument("--token-delay", type=float, default=0.03)
+    parser.add_argument("--tts-ttfb", type=float, default=0.2)
+    parser.add_argument("--chars-per-second", type=float, default=15.0)
+    parser.add_argument("--tts-realtime-factor", type=float, default=4.0)
+    # Newer livekit-agents releases ignore interruptions for the first 3s of
+    # agent speech (AEC warmup), barging in earlier measures that window instead
+    parser.add_argument("--barge-in-after", type=float, default=3.5, help="seconds of agent audio before talking over it")
+    parser.add_argument("--speculation", action="store_true", help="start the LLM on interim transcripts")
+    parser.add_argument("--stagger", type=float, default=0.01, help="delay between session starts")
+    parser.add_argument("--turn-timeout", type=float, default=20.0)
+    logging.getLogger("agent").setLevel(logging.WARNING)
+    asyncio.run(main(parser.parse_args()))
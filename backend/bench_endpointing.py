@@ -0,0 +1,217 @@
+"""
+Offline endpointing evaluator: turn latency vs. false-cut rate per VAD setting.
+
+Replays labeled audio through the silero VAD once to get its speech
+probability track, then runs the VAD's start/end-of-speech state machine
+over that track for every setting in the grid and for the adaptive
+controller from endpointing.py (starting from agent.VAD_DEFAULTS).
+
+Labels are a JSON list, audio paths relative to the labels file:
+    [{"audio": "call1.wav", "turn_ends": [3.42, 11.9, ...]}, ...]
+where turn_ends are the times (seconds) at which the user really finished
+a turn. Audio must be 16 kHz 16-bit mono WAV.
+
+Without --labels a synthetic corpus is used: talkers with different pause
+habits, as noisy probability tracks.
+
+For each setting:
+    vad latency      labeled turn end -> VAD end of speech
+    turn latency     the same, but not less than --transcription-delay
+                     (the turn cannot end before the final transcript)
+    false cuts       end of speech inside a turn, per labeled turn
+    missed           labeled turn ends without an end of speech
+
+Run from the backend directory:
+    python bench_endpointing.py
+    python bench_endpointing.py --labels calls/labels.json --output endpointing.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+
+from agent import VAD_DEFAULTS
+from endpointing import AdaptiveEndpointing
+from latency import QuantileSketch
+
+# Silero scores 512-sample windows at 16 kHz
+WINDOW = 0.032
+# A VAD end of speech within this distance of a labeled turn end counts as that turn
+MATCH_TOLERANCE = 0.2
+
+
+# ----------------- Probability tracks -----------------
+async def silero_track(path: str) -> list:
+    from livekit.plugins import silero
+
+    from bench_e2e import load_pcm, to_frames
+
+    stream = silero.VAD.load(force_cpu=True).stream()
+    for frame in to_frames(load_pcm(path)):
+        stream.push_frame(frame)
+    stream.end_input()
+    track = []
+    async for event in stream:
+        if event.type.value == "inference_done":
+            track.append(event.probability)
+    return track
+
+
+def synthetic_corpus(calls: int, seed: int) -> list:
+    """[(probability track, turn_ends), ...] for talkers with short to long pauses."""
+    rng = random.Random(seed)
+    corpus = []
+    for call in range(calls):
+        # Typical mid-turn pause of this talker
+        pause_scale = 0.08 + 0.25 * call / max(1, calls - 1)
+        track, turn_ends, t = [], [], 0.0
+
+        def add(seconds, low, high):
+            nonlocal t
+            for _ in range(max(1, int(seconds / WINDOW))):
+                track.append(rng.uniform(low, high))
+                t += WINDOW
+
+        add(1.0, 0.0, 0.2)
+        for _ in range(12):
+            for word in range(rng.randint(2, 6)):
+                if word:
+                    add(min(1.2, rng.expovariate(1 / pause_scale)), 0.0, 0.25)
+                add(rng.uniform(0.3, 1.2), 0.6, 0.98)
+            turn_ends.append(t)
+            # The agent answers in the gap
+            add(rng.uniform(2.5, 4.0), 0.0, 0.2)
+        corpus.append((track, turn_ends))
+    return corpus
+
+
+# ----------------- Simulation -----------------
+def simulate(track: list, turn_ends: list, options: dict, controller: AdaptiveEndpointing = None, transcription_delay=0.0) -> dict:
+    """Run the VAD state machine over one probability track and score it against the labels."""
+    speaking = False
+    speech = silence = 0.0
+    last_speech_end = 0.0
+    cuts = []  # (speech end, end-of-speech time)
+    pending_cut = None  # false cut waiting for the user to resume
+    for i, probability in enumerate(track):
+        t = (i + 1) * WINDOW
+        if controller is not None:
+            options = dict(options, **controller.options)
+        threshold = options["activation_threshold"]
+        if probability >= threshold or (speaking and probability > max(threshold - 0.15, 0.01)):
+            speech += WINDOW
+            silence = 0.0
+            last_speech_end = t
+            if not speaking and speech >= options["min_speech_duration"]:
+                speaking = True
+                if pending_cut is not None and controller is not None:
+                    controller.on_false_cut(t - speech - pending_cut)
+                pending_cut = None
+        else:
+            silence += WINDOW
+            speech = 0.0
+            if speaking and silence >= options["min_silence_duration"]:
+                speaking = False
+                cuts.append((last_speech_end, t))
+                true_end = any(abs(last_speech_end - end) <= MATCH_TOLERANCE for end in turn_ends)
+                if controller is not None:
+                    if true_end:
+                        controller.on_turn(transcription_delay)
+                    else:
+                        pending_cut = last_speech_end
+
+    latencies, matched = [], set()
+    false_cuts = 0
+    for speech_end, detected in cuts:
+        match = next((end for end in turn_ends if abs(speech_end - end) <= MATCH_TOLERANCE), None)
+        if match is None:
+            false_cuts += 1
+        else:
+            matched.add(match)
+            latencies.append(detected - match)
+    return {
+        "latencies": latencies,
+        "false_cuts": false_cuts,
+        "turns": len(turn_ends),
+        "missed": len(turn_ends) - len(matched),
+    }
+
+
+def evaluate(corpus: list, label: str, options=None, adaptive=False, transcription_delay=0.0) -> dict:
+    vad_latency, turn_latency = QuantileSketch(), QuantileSketch()
+    false_cuts = turns = missed = 0
+    controller = None
+    for track, turn_ends in corpus:
+        if adaptive:
+            # One session per call, like the agent
+            controller = AdaptiveEndpointing(VAD_DEFAULTS)
+        result = simulate(track, turn_ends, options or VAD_DEFAULTS, controller, transcription_delay)
+        for latency in result["latencies"]:
+            vad_latency.add(latency)
+            turn_latency.add(max(latency, transcription_delay))
+        false_cuts += result["false_cuts"]
+        turns += result["turns"]
+        missed += result["missed"]
+    return {
+        "setting": label,
+        "vad_latency": vad_latency.summary(),
+        "turn_latency": turn_latency.summary(),
+        "false_cut_rate": false_cuts / turns if turns else 0.0,
+        "missed": missed,
+        "turns": turns,
+    }
+
+
+def report(result: dict):
+    latency = result["turn_latency"]
+    if latency["count"] == 0:
+        print(f"  {result['setting']:<28} no turns detected")
+        return
+    print(
+        f"  {result['setting']:<28} turn p50={latency['p50'] * 1000:6.0f}ms p90={latency['p90'] * 1000:6.0f}ms  "
+        f"false cuts={result['false_cut_rate'] * 100:5.1f}%  missed={result['missed']}"
+    )
+
+
+async def load_corpus(args) -> list:
+    if not args.labels:
+        return synthetic_corpus(args.calls, args.seed)
+    with open(args.labels) as f:
+        labels = json.load(f)
+    base = os.path.dirname(os.path.abspath(args.labels))
+    return [(await silero_track(os.path.join(base, item["audio"])), item["turn_ends"]) for item in labels]
+
+
+async def main(args):
+    corpus = await load_corpus(args)
+    source = args.labels or f"synthetic corpus ({args.calls} calls)"
+    print(f"Endpointing on {source}, transcription delay {args.transcription_delay * 1000:.0f}ms")
+    results = []
+    for threshold in args.thresholds:
+        for silence in args.silences:
+            options = dict(VAD_DEFAULTS, min_silence_duration=silence, activation_threshold=threshold)
+            results.append(evaluate(
+                corpus, f"silence={silence:.2f} threshold={threshold:.2f}", options,
+                transcription_delay=args.transcription_delay,
+            ))
+            report(results[-1])
+    results.append(evaluate(corpus, "adaptive", adaptive=True, transcription_delay=args.transcription_delay))
+    report(results[-1])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline endpointing evaluator")
+    parser.add_argument("--labels", help="JSON list of {audio, turn_ends}")
+    parser.add_argument("--calls", type=int, default=20, help="synthetic calls when no labels are given")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--silences", type=float, nargs="+", default=[0.4, 0.55, 0.7, 0.85, 1.0])
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.5])
+    parser.add_argument("--transcription-delay", type=float, default=0.35)
+    parser.add_argument("--output")
+    asyncio.run(main(parser.parse_args()))
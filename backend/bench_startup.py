@@ -0,0 +1,58 @@
+"""
+Compares cold vs. warm plugin setup at job start.
+
+Cold: every job loads the VAD and builds STT/TTS itself (the old behaviour).
+Warm: the process loaded them once and jobs only pick them out of userdata.
+
+Only the plugin loads are timed (load_plugins() in agent.py), not the rest
+of prewarm(): pre-rendering prompts calls the TTS service and the LLM
+clients and caches have no per-job counterpart in the old behaviour.
+
+Run from the backend directory:
+    python bench_startup.py --jobs 10
+"""
+import argparse
+import statistics
+import time
+from types import SimpleNamespace
+
+from agent import VAD_DEFAULTS, load_plugins
+
+
+def start_job(proc):
+    # Mirrors the plugin setup done at the top of entrypoint()
+    if "vad" not in proc.userdata:
+        load_plugins(proc)
+    proc.userdata["vad"].update_options(**VAD_DEFAULTS)
+
+
+def run(jobs: int, warm: bool) -> list:
+    shared = SimpleNamespace(userdata={})
+    if warm:
+        load_plugins(shared)
+
+    timings = []
+    for _ in range(jobs):
+        proc = shared if warm else SimpleNamespace(userdata={})
+        start = time.perf_counter()
+        start_job(proc)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label: str, timings: list):
+    print(
+        f"{label:<5} jobs={len(timings):<4} "
+        f"mean={statistics.mean(timings):8.2f}ms  "
+        f"p50={statistics.median(timings):8.2f}ms  "
+        f"max={max(timings):8.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold vs. warm plugin setup benchmark")
+    parser.add_argument("--jobs", type=int, default=10)
+    args = parser.parse_args()
+
+    report("cold", run(args.jobs, warm=False))
+    report("warm", run(args.jobs, warm=True))
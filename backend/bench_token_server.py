@@ -0,0 +1,63 @@
+"""
+Load test for the token service: requests per second and latency percentiles.
+
+By default the app is driven in-process through httpx's ASGI transport, which
+measures the service itself without network noise. Pass --url to hit a
+running server instead.
+
+Run from the backend directory:
+    python bench_token_server.py --requests 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+os.environ.setdefault("LIVEKIT_API_KEY", "bench-key")
+os.environ.setdefault("LIVEKIT_API_SECRET", "bench-secret-bench-secret-bench-secret")
+os.environ.setdefault("TOKEN_LOG_SAMPLE_RATE", "0")
+
+import server  # noqa: E402
+
+
+async def run(args) -> list:
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url)
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench")
+
+    latencies = []
+    counter = iter(range(args.requests))
+
+    async def worker():
+        for i in counter:
+            # --identities controls how many distinct identities there are, i.e. the memo hit rate
+            identity = f"user-{i % args.identities}"
+            start = time.perf_counter()
+            response = await client.get("/get-token", params={"identity": identity, "model": "bench"})
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    async with client:
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Token service load test")
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process)")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--identities", type=int, default=5000, help="Distinct identities to cycle through")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    latencies = asyncio.run(run(args))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"requests={len(latencies)} concurrency={args.concurrency} identities={args.identities}")
+    print(f"rps={len(latencies) / elapsed:.0f}  p50={statistics.median(latencies) * 1000:.2f}ms  p99={p99 * 1000:.2f}ms")
@@ -0,0 +1,53 @@
+"""
+Compares packet size and encode time of the JSON and binary agent_metrics formats.
+
+Run from the backend directory:
+    python bench_wire.py --iterations 20000
+"""
+import argparse
+import json
+import time
+
+import wire
+
+SAMPLE_EVENTS = [
+    {"type": "vad_update", "status": "SPEAKING"},
+    {"type": "transcript_update", "transcript": "what's the weather in Pune today", "speaker": "user"},
+    {"type": "metrics_update", "metric_type": "eou", "data": {
+        "end_of_utterance_delay": 1.0421, "transcription_delay": 0.3127, "timestamp": 1760700000.123}},
+    {"type": "metrics_update", "metric_type": "llm", "data": {
+        "ttft": 0.8123, "total_tokens": 1543, "prompt_tokens": 1410, "completion_tokens": 133,
+        "tokens_per_second": 54.2, "timestamp": 1760700001.456}},
+    {"type": "metrics_update", "metric_type": "tts", "data": {
+        "ttfb": 0.2431, "audio_duration": 4.82, "timestamp": 1760700001.789}},
+    {"type": "metrics_update", "metric_type": "stt", "data": {
+        "audio_duration": 3.1, "timestamp": 1760700002.012}},
+]
+
+
+def encode_json(events):
+    return json.dumps({"type": "batch", "events": events}).encode("utf-8")
+
+
+def time_encoder(encode, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        encode(SAMPLE_EVENTS)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON vs. binary wire format benchmark")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    assert wire.decode_packet(wire.encode_packet(SAMPLE_EVENTS)) == SAMPLE_EVENTS
+
+    json_size = len(encode_json(SAMPLE_EVENTS))
+    binary_size = len(wire.encode_packet(SAMPLE_EVENTS))
+    json_us = time_encoder(encode_json, args.iterations)
+    binary_us = time_encoder(wire.encode_packet, args.iterations)
+
+    print(f"events per packet: {len(SAMPLE_EVENTS)}")
+    print(f"json   size={json_size:5d}B  encode={json_us:7.2f}us")
+    print(f"binary size={binary_size:5d}B  encode={binary_us:7.2f}us  ({binary_size / json_size:.0%} of json)")
@@ -0,0 +1,76 @@
+"""
+Check that metrics written in job processes reach the worker's endpoint.
+
+Imports livekit.agents before exporter (the order that used to leave every
+series in process-local memory), then sets the loop-lag gauge and a counter
+in a spawned child process, the way LiveKit runs jobs, and the active
+session gauge in this process. All of them are read back through
+read_gauge() and the aggregated registry in this process. The child is
+then killed, the way a crashed job ends, and its loop lag must no longer
+be reported while its counter is kept.
+
+Exits non-zero if any value is not as expected.
+
+Run from the backend directory:
+    python check_exporter.py
+"""
+import multiprocessing
+import sys
+
+import livekit.agents  # noqa: F401  imported first on purpose
+
+import exporter
+
+LAG = 0.5
+
+
+def job_process(ready, stop):
+    import livekit.agents  # noqa: F401
+
+    import exporter
+
+    exporter.EVENT_LOOP_LAG.set(LAG)
+    exporter.HANDLER_ERRORS.labels(handler="check").inc()
+    ready.set()
+    stop.wait()
+
+
+def counter_value(name: str, handler: str) -> float:
+    for metric in exporter._aggregate().collect():
+        if metric.name == name:
+            return sum(s.value for s in metric.samples if s.labels.get("handler") == handler and s.name.endswith("_total"))
+    return 0.0
+
+
+def check(label: str, value: float, expected: float) -> bool:
+    print(f"{label}: {value} (expected {expected})")
+    return value == expected
+
+
+def main() -> int:
+    context = multiprocessing.get_context("spawn")
+    ready, stop = context.Event(), context.Event()
+    child = context.Process(target=job_process, args=(ready, stop))
+    child.start()
+    ready.wait(timeout=30)
+
+    exporter.ACTIVE_SESSIONS.inc()
+
+    ok = check("loop lag from child", exporter.current_loop_lag(), LAG)
+    ok &= check("handler errors from child", counter_value("agent_handler_errors", "check"), 1.0)
+    ok &= check("active sessions from this process", exporter.read_gauge("agent_active_sessions"), 1.0)
+
+    child.kill()
+    child.join()
+    ok &= check("loop lag after the child was killed", exporter.current_loop_lag(), 0.0)
+    ok &= check("handler errors after the child was killed", counter_value("agent_handler_errors", "check"), 1.0)
+
+    if not ok:
+        print("FAIL: metrics are not aggregated as expected")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Text chunking between the LLM stream and TTS.
+
+The first phrase is cut at the first clause boundary so synthesis can start
+after a few words; later segments are cut on sentence boundaries and are
+synthesized concurrently while earlier audio is still playing.
+"""
+import asyncio
+import re
+
+SENTENCE_END = re.compile(r"[.!?](?:[\"')\]]*)\s")
+CLAUSE_END = re.compile(r"[,;:—](?:[\"')\]]*)\s|[.!?](?:[\"')\]]*)\s")
+
+
+class TextChunker:
+    """
+    Splits streamed text into segments sized for TTS.
+
+    With fast_first=False every segment, including the first, waits for a
+    sentence boundary.
+    """
+
+    def __init__(self, first_min_chars=20, first_max_chars=60, min_chars=60, max_chars=250, fast_first=True):
+        self.fast_first = fast_first
+        self.first_min_chars = first_min_chars
+        self.first_max_chars = first_max_chars
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+        self._first = fast_first
+
+    def push(self, text: str) -> list:
+        """Add streamed text and return any segments that are ready."""
+        self._buffer += text
+        segments = []
+        while True:
+            segment = self._next_segment()
+            if segment is None:
+                return segments
+            segments.append(segment)
+
+    def flush(self) -> list:
+        """Return whatever is left once the stream ends."""
+        rest = self._buffer.strip()
+        self._buffer = ""
+        self._first = self.fast_first
+        return [rest] if rest else []
+
+    def _next_segment(self):
+        if self._first:
+            min_chars, max_chars, boundary = self.first_min_chars, self.first_max_chars, CLAUSE_END
+        else:
+            min_chars, max_chars, boundary = self.min_chars, self.max_chars, SENTENCE_END
+
+        cut = None
+        for match in boundary.finditer(self._buffer, min_chars):
+            cut = match.end()
+            break
+        if cut is None and len(self._buffer) > max_chars:
+            # Past the size limit: prefer a clause boundary, then any whitespace
+            window = self._buffer[:max_chars]
+            clauses = [m.end() for m in CLAUSE_END.finditer(window)]
+            cut = clauses[-1] if clauses else window.rfind(" ") + 1 or max_chars
+        if cut is None:
+            return None
+
+        segment, self._buffer = self._buffer[:cut].strip(), self._buffer[cut:]
+        if not segment:
+            return None
+        self._first = False
+        return segment
+
+
+async def chunk_stream(text_stream, chunker: TextChunker):
+    """Turn an async iterable of text deltas into an async iterator of segments."""
+    async for delta in text_stream:
+        for segment in chunker.push(delta):
+            yield segment
+    for segment in chunker.flush():
+        yield segment
+
+
+async def synthesize_pipelined(segments, synthesize, max_concurrency=2):
+    """
+    Yield audio for each segment in order while later segments synthesize.
+
+    synthesize(segment) must return an async iterable of frames. Up to
+    max_concurrency segments are synthesized at once; frames of the segment
+    currently playing are yielded as soon as they arrive.
+    """
+    slots = asyncio.Semaphore(max_concurrency)
+    order = asyncio.Queue()
+    tasks = []
+
+    async def run_segment(segment, frames):
+        try:
+            async for frame in synthesize(segment):
+                await frames.put(frame)
+        finally:
+            await frames.put(None)
+
+    async def schedule():
+        try:
+            async for segment in segments:
+                await slots.acquire()
+                frames = asyncio.Queue()
+                tasks.append(asyncio.create_task(run_segment(segment, frames)))
+                await order.put(frames)
+        finally:
+            await order.put(None)
+
+    scheduler = asyncio.create_task(schedule())
+    try:
+        while True:
+            frames = await order.get()
+            if frames is None:
+                break
+            try:
+                while True:
+                    frame = await frames.get()
+                    if frame is None:
+                        break
+                    yield frame
+            finally:
+                slots.release()
+        # Surface errors from the text stream
+        await scheduler
+        for task in tasks:
+            await task
+    finally:
+        scheduler.cancel()
+        for task in tasks:
+            task.cancel()
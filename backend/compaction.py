@@ -0,0 +1,230 @@
+"""
+Context compaction: keeps LLM prompt tokens flat on long calls.
+
+The session resends its whole chat history to the LLM every turn, so
+prompt_tokens (and TTFT with them) grow with the length of the call.
+ContextCompactor rewrites the history passed to each LLM call:
+
+  - the leading instructions and the last keep_turns turns stay verbatim
+  - older turns are replaced by a running summary, written in the background
+    after a reply has finished, so the summary call never sits in front of a
+    user's answer
+  - older turns not covered by the summary yet are kept, and only dropped
+    (oldest first) if the prompt is still over the model's max_tokens
+  - tool calls, tool results and non-text content are stripped from every
+    turn but the current one, their answer is already in the reply
+
+The session's own history is left alone, so transcripts stay complete.
+Token counts are estimates (about 4 characters per token); the exact
+prompt_tokens are still reported by LLMMetrics.
+"""
+import asyncio
+import logging
+
+from livekit.agents.llm import ChatContext
+
+from prompts import SUMMARY_INSTRUCTIONS
+from session_factory import DEFAULT_PIPELINE_MODEL
+
+logger = logging.getLogger("agent")
+
+# Per-model prompt budgets, per job: a "context" object in job metadata
+CONTEXT_BUDGETS = {
+    DEFAULT_PIPELINE_MODEL: {"max_tokens": 3000, "keep_turns": 4},
+    "gemini-2.0-flash": {"max_tokens": 4000, "keep_turns": 4},
+    "gemini-2.5-flash": {"max_tokens": 6000, "keep_turns": 6},
+}
+DEFAULT_CONTEXT_BUDGET = {"max_tokens": 4000, "keep_turns": 4}
+
+# Rough per-item overhead of roles and separators, in tokens
+ITEM_OVERHEAD = 4
+
+
+def context_budget(model: str, overrides: dict = None) -> dict:
+    """The model's budget with valid per-job overrides merged over it."""
+    budget = dict(CONTEXT_BUDGETS.get(model, DEFAULT_CONTEXT_BUDGET))
+    for key, value in (overrides or {}).items():
+        if key not in budget:
+            logger.warning(f"Ignoring unknown context option: {key}")
+            continue
+        try:
+            budget[key] = max(0, int(value))
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring invalid value for context option {key}: {value!r}")
+    return budget
+
+
+def estimate_tokens(items) -> int:
+    total = 0
+    for item in items:
+        total += ITEM_OVERHEAD
+        if item.type == "message":
+            total += len(item.text_content or "") // 4
+        elif item.type == "function_call":
+            total += (len(item.name) + len(item.arguments)) // 4
+        elif item.type == "function_call_output":
+            total += len(item.output) // 4
+    return total
+
+
+def split_turns(items) -> tuple:
+    """(instructions, [turn, ...]) where each turn starts at a user message."""
+    head, turns = [], []
+    for item in items:
+        if item.type == "message" and item.role == "user":
+            turns.append([item])
+        elif turns:
+            turns[-1].append(item)
+        else:
+            head.append(item)
+    return head, turns
+
+
+def strip_turn(turn: list) -> list:
+    """Only the text of the turn's messages, without tool calls, results or media."""
+    stripped = []
+    for item in turn:
+        if item.type != "message":
+            continue
+        text = item.text_content
+        if not text:
+            continue
+        if item.content != [text]:
+            item = item.model_copy(update={"content": [text]})
+        stripped.append(item)
+    return stripped
+
+
+def render_turns(turns: list) -> str:
+    lines = []
+    for turn in turns:
+        for item in strip_turn(turn):
+            lines.append(f"{item.role.capitalize()}: {item.text_content}")
+    return "\n".join(lines)
+
+
+def llm_summarizer(llm_client):
+    """summarize(summary, transcript) -> new summary, using llm_client without tools."""
+
+    async def summarize(summary: str, transcript: str) -> str:
+        chat_ctx = ChatContext.empty()
+        chat_ctx.add_message(role="system", content=SUMMARY_INSTRUCTIONS)
+        chat_ctx.add_message(
+            role="user",
+            content=f"Summary so far:\n{summary or '(none)'}\n\nNew conversation:\n{transcript}",
+        )
+        parts = []
+        async with llm_client.chat(chat_ctx=chat_ctx) as stream:
+            async for chunk in stream:
+                if chunk.delta and chunk.delta.content:
+                    parts.append(chunk.delta.content)
+        return "".join(parts).strip()
+
+    return summarize
+
+
+class ContextCompactor:
+    """
+    Compacts the chat context of one session before each LLM call.
+
+    summarize is an async callable (summary, transcript) -> summary, see
+    llm_summarizer(). on_compact, if given, is called with the estimated
+    prompt tokens before and after every compaction. compact(record=False)
+    leaves stats, on_compact and the turns to summarize untouched, for
+    requests that may never be sent (see speculation.py).
+    """
+
+    def __init__(self, summarize=None, max_tokens=4000, keep_turns=4, on_compact=None):
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.summary = ""
+        self._summarize = summarize
+        self._on_compact = on_compact
+        # First item ids of the turns folded into the summary
+        self._summarized = set()
+        self._pending = []
+        self._task = None
+        self.stats = {
+            "compactions": 0,
+            "summaries": 0,
+            "summary_failures": 0,
+            "dropped_turns": 0,
+            "tokens_before": 0,
+            "tokens_after": 0,
+        }
+
+    def compact(self, chat_ctx: ChatContext, record=True) -> ChatContext:
+        head, turns = split_turns(chat_ctx.items)
+        # The current turn is always kept
+        split = max(0, len(turns) - max(1, self.keep_turns))
+        older = [turn for turn in turns[:split] if turn[0].id not in self._summarized]
+        recent = turns[split:]
+
+        summary = []
+        if self.summary:
+            summary_ctx = ChatContext.empty()
+            summary_ctx.add_message(role="system", content=f"Summary of the earlier conversation:\n{self.summary}")
+            summary = summary_ctx.items
+
+        kept_older = [strip_turn(turn) for turn in older]
+        kept_recent = [strip_turn(turn) for turn in recent[:-1]] + recent[-1:]
+        fixed = head + summary + [item for turn in kept_recent for item in turn]
+        budget = self.max_tokens - estimate_tokens(fixed)
+        older_tokens = [estimate_tokens(turn) for turn in kept_older]
+        # Not summarized in time, drop the oldest rather than go over budget
+        dropped = 0
+        while kept_older and sum(older_tokens) > budget:
+            kept_older.pop(0)
+            older_tokens.pop(0)
+            dropped += 1
+
+        items = head + summary + [item for turn in kept_older + kept_recent for item in turn]
+        if not record:
+            return ChatContext(items)
+        before, after = estimate_tokens(chat_ctx.items), estimate_tokens(items)
+        self.stats["dropped_turns"] += dropped
+        self.stats["compactions"] += 1
+        self.stats["tokens_before"], self.stats["tokens_after"] = before, after
+        if self._on_compact is not None:
+            self._on_compact(before, after)
+        # Summarized after the reply, see summarize_later()
+        self._pending = older
+        return ChatContext(items)
+
+    def summarize_later(self):
+        """Fold the older turns seen by the last compact() into the summary, in the background."""
+        if self._summarize is None or not self._pending:
+            return
+        if self._task is not None and not self._task.done():
+            return
+        turns = [turn for turn in self._pending if turn[0].id not in self._summarized]
+        self._pending = []
+        if not turns:
+            return
+        self._task = asyncio.create_task(self._fold(turns))
+
+    async def _fold(self, turns: list):
+        try:
+            summary = await self._summarize(self.summary, render_turns(turns))
+        except Exception as e:
+            self.stats["summary_failures"] += 1
+            logger.warning(f"Context summary failed, keeping turns verbatim: {e}")
+            return
+        if not summary:
+            self.stats["summary_failures"] += 1
+            return
+        self.summary = summary
+        self._summarized.update(turn[0].id for turn in turns)
+        self.stats["summaries"] += 1
+
+    def log_summary(self, label: str):
+        s = self.stats
+        logger.info(
+            f"🗜️  {label} context: last prompt ~{s['tokens_before']} -> ~{s['tokens_after']} tokens, "
+            f"compactions={s['compactions']} summaries={s['summaries']} "
+            f"summary_failures={s['summary_failures']} dropped_turns={s['dropped_turns']}"
+        )
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
@@ -0,0 +1,85 @@
+"""
+Incremental conversation store for the Streamlit client.
+
+Data packets are decoded and applied on the room's event-loop thread; the
+Streamlit script only reads snapshots. Messages are append-only lists of
+text segments with a version number that changes whenever the message
+does, so a renderer can tell what changed since it last drew without
+diffing text, and the joined text is only rebuilt for changed messages.
+
+The client redraws once per frame budget (see ui.py) instead of once per
+packet, so agent chunks arriving faster than that are coalesced, and
+window() keeps long histories to the last few messages. The store version
+tells it when the last snapshot can be drawn again as is.
+"""
+import threading
+
+
+class Message:
+    def __init__(self, index: int, role: str):
+        self.index = index
+        self.role = role
+        self.segments = []
+        self.is_final = True
+        self.version = 0
+        self._text = ""
+        self._text_version = 0
+
+    def append(self, text: str):
+        self.segments.append(text)
+        self.version += 1
+
+    def replace(self, text: str, is_final: bool):
+        """Interim transcripts resend the whole utterance, so they replace instead of append."""
+        if self.segments == [text] and self.is_final == is_final:
+            return False
+        self.segments = [text]
+        self.is_final = is_final
+        self.version += 1
+        return True
+
+    @property
+    def text(self) -> str:
+        if self._text_version != self.version:
+            self._text = "".join(self.segments)
+            self._text_version = self.version
+        return self._text
+
+
+class ConversationStore:
+    """Thread-safe chat history fed by agent data packets."""
+
+    def __init__(self):
+        self.messages = []
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def apply(self, payload: dict) -> bool:
+        """Apply one decoded payload; returns whether anything changed."""
+        with self._lock:
+            if payload["type"] == "user_transcript":
+                message = self._last("user")
+                changed = message.replace(payload["text"], payload["is_final"])
+            elif payload["type"] == "agent_chunk":
+                self._last("assistant").append(payload["text"])
+                changed = True
+            else:
+                return False
+            if changed:
+                self.version += 1
+            return changed
+
+    def _last(self, role: str) -> Message:
+        if not self.messages or self.messages[-1].role != role:
+            self.messages.append(Message(len(self.messages), role))
+        return self.messages[-1]
+
+    def window(self, size: int) -> tuple:
+        """(hidden, [(index, role, text, is_final, version), ...]) for the last size messages."""
+        with self._lock:
+            shown = self.messages[-size:] if size else self.messages
+            return (
+                len(self.messages) - len(shown),
+                [(m.index, m.role, m.text, m.is_final, m.version) for m in shown],
+            )
+
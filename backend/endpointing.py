@@ -0,0 +1,197 @@
+"""
+Adaptive endpointing: per-session VAD tuning from what the session observes.
+
+A fixed min_silence_duration has to be long enough for the slowest talker's
+mid-sentence pauses, so every other turn pays for it in end_of_utterance
+delay. AdaptiveEndpointing starts from the configured VAD options and
+
+  - shortens the silence window after clean turns, but never below the
+    STT's typical transcription delay (the turn cannot end before the final
+    transcript anyway, see EOUMetrics.transcription_delay)
+  - lengthens it after a false cut (the user resumed talking right after
+    we ended their turn), at least past the pause that was cut
+  - raises the activation threshold after a false barge-in (agent speech
+    interrupted by something that never produced a transcript) and lets it
+    fall back to the configured value over clean turns
+
+Every option stays inside ENDPOINTING_BOUNDS. The controller only sees
+plain numbers, so bench_endpointing.py replays it offline; EndpointingMonitor
+turns session events into those numbers.
+"""
+import asyncio
+import logging
+import time
+
+from latency import QuantileSketch
+
+logger = logging.getLogger("agent")
+
+# Hard limits for adapted values
+ENDPOINTING_BOUNDS = {
+    "min_silence_duration": (0.35, 1.5),
+    "activation_threshold": (0.35, 0.8),
+}
+
+# User speech starting this soon after their turn ended, while the agent is
+# answering, means the turn was cut too early
+RESUME_WINDOW = 1.5
+# A barge-in with no final transcript this long after the user went quiet was noise
+BARGE_IN_TRANSCRIPT_GRACE = 0.75
+
+
+def clamp(name: str, value: float, bounds: dict = ENDPOINTING_BOUNDS) -> float:
+    low, high = bounds[name]
+    return min(high, max(low, value))
+
+
+class AdaptiveEndpointing:
+    """
+    Adjusts min_silence_duration and activation_threshold from turn outcomes.
+
+    apply is called with the changed options (e.g. vad.update_options)
+    whenever they change.
+    """
+
+    def __init__(
+        self,
+        options: dict,
+        bounds: dict = ENDPOINTING_BOUNDS,
+        shrink=0.9,
+        grow=1.3,
+        threshold_step=0.05,
+        cooldown_turns=3,
+        apply=None,
+    ):
+        self.bounds = bounds
+        self.initial = {name: clamp(name, options[name], bounds) for name in bounds}
+        self.options = dict(self.initial)
+        self.shrink = shrink
+        self.grow = grow
+        self.threshold_step = threshold_step
+        self.cooldown_turns = cooldown_turns
+        self._apply = apply
+        self._cooldown = 0
+        self.transcription_delay = QuantileSketch()
+        self.cut_pauses = QuantileSketch()
+        self.stats = {"turns": 0, "false_cuts": 0, "false_barge_ins": 0, "adjustments": 0}
+
+    def _set(self, name: str, value: float):
+        value = round(clamp(name, value, self.bounds), 3)
+        if value != self.options[name]:
+            self.options[name] = value
+            self.stats["adjustments"] += 1
+            if self._apply is not None:
+                self._apply(**{name: value})
+
+    def on_turn(self, transcription_delay: float = None):
+        """A turn ended without being cut; shrink the silence window toward the floor."""
+        self.stats["turns"] += 1
+        if transcription_delay is not None:
+            self.transcription_delay.add(transcription_delay)
+        if self._cooldown > 0:
+            self._cooldown -= 1
+        else:
+            floor = self.transcription_delay.quantile(0.5) or 0.0
+            # Do not go back below pauses we have already cut
+            if self.cut_pauses.count:
+                floor = max(floor, self.cut_pauses.quantile(0.9))
+            silence = self.options["min_silence_duration"]
+            target = max(floor, silence * self.shrink)
+            if target < silence:
+                self._set("min_silence_duration", target)
+        threshold = self.options["activation_threshold"]
+        default = self.initial["activation_threshold"]
+        if threshold > default:
+            self._set("activation_threshold", max(default, threshold - self.threshold_step / 4))
+
+    def on_false_cut(self, pause: float = None):
+        """The user kept talking after a pause of `pause` seconds that ended their turn."""
+        self.stats["false_cuts"] += 1
+        self._cooldown = self.cooldown_turns
+        silence = self.options["min_silence_duration"] * self.grow
+        if pause is not None:
+            self.cut_pauses.add(pause)
+            silence = max(silence, pause + 0.1)
+        self._set("min_silence_duration", silence)
+
+    def on_false_barge_in(self):
+        self.stats["false_barge_ins"] += 1
+        self._set("activation_threshold", self.options["activation_threshold"] + self.threshold_step)
+
+    def log_summary(self, label: str):
+        s = self.stats
+        logger.info(
+            f"🎚️  {label} endpointing: silence={self.options['min_silence_duration']:.2f}s "
+            f"threshold={self.options['activation_threshold']:.2f} turns={s['turns']} "
+            f"false_cuts={s['false_cuts']} false_barge_ins={s['false_barge_ins']} adjustments={s['adjustments']}"
+        )
+
+
+class EndpointingMonitor:
+    """
+    Detects false cuts and false barge-ins from session state events.
+
+    Feed it user_state_changed, agent_state_changed and final transcripts;
+    outcomes go to the controller (an AdaptiveEndpointing) and, when
+    counter is given, to counter.labels(kind=...).inc().
+    """
+
+    def __init__(self, controller: AdaptiveEndpointing = None, counter=None, clock=time.monotonic):
+        self.controller = controller
+        self._counter = counter
+        self._clock = clock
+        self._agent_state = "initializing"
+        self._user_speaking = False
+        self._speech_ended_at = None
+        self._barge_in_at = None
+        self._last_transcript_at = float("-inf")
+        self._pending = set()
+
+    def _record(self, kind: str):
+        if self._counter is not None:
+            self._counter.labels(kind=kind).inc()
+
+    def on_agent_state(self, state: str):
+        self._agent_state = state
+
+    def on_transcript(self, is_final: bool):
+        if is_final:
+            self._last_transcript_at = self._clock()
+
+    def on_eou(self, transcription_delay: float = None):
+        if self.controller is not None:
+            self.controller.on_turn(transcription_delay)
+
+    def on_user_state(self, state: str):
+        now = self._clock()
+        if state == "speaking" and not self._user_speaking:
+            self._user_speaking = True
+            answering = self._agent_state in ("thinking", "speaking")
+            if answering and self._speech_ended_at is not None and now - self._speech_ended_at < RESUME_WINDOW:
+                self._record("false_cut")
+                if self.controller is not None:
+                    # The VAD only reports the end of speech after the silence window
+                    pause = now - self._speech_ended_at + self.controller.options["min_silence_duration"]
+                    self.controller.on_false_cut(pause)
+            elif self._agent_state == "speaking":
+                self._barge_in_at = now
+        elif state != "speaking" and self._user_speaking:
+            self._user_speaking = False
+            self._speech_ended_at = now
+            if self._barge_in_at is not None:
+                barge_in_at, self._barge_in_at = self._barge_in_at, None
+                # Transcripts trail the VAD, give the STT a moment before judging
+                task = asyncio.ensure_future(self._check_barge_in(barge_in_at))
+                self._pending.add(task)
+                task.add_done_callback(self._pending.discard)
+
+    async def _check_barge_in(self, barge_in_at: float):
+        await asyncio.sleep(BARGE_IN_TRANSCRIPT_GRACE)
+        if self._last_transcript_at < barge_in_at:
+            self._record("false_barge_in")
+            if self.controller is not None:
+                self.controller.on_false_barge_in()
+
+    async def aclose(self):
+        for task in list(self._pending):
+            task.cancel()
@@ -0,0 +1,165 @@
+"""
+Prometheus/OpenMetrics export for agent workers.
+
+LiveKit runs every job in its own child process, so metrics are written in
+prometheus_client's multiprocess mode and the parent worker process serves
+the aggregated view. PROMETHEUS_MULTIPROC_DIR has to be set before
+prometheus_client picks its value class, so the launchers import this
+module before livekit.agents (which imports prometheus_client itself);
+child processes inherit the variable from the parent. If prometheus_client
+was imported first anyway, the value class is picked again here so the
+metrics below still go to the multiprocess directory.
+
+check_exporter.py checks that a gauge set in a child process shows up in
+read_gauge() in the parent, and is gone once that process is killed.
+"""
+import glob
+import os
+import sys
+import tempfile
+
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="agent-metrics-")
+
+if "prometheus_client.values" in sys.modules:
+    from prometheus_client import values as _values
+
+    _values.ValueClass = _values.get_value_class()
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, start_http_server  # noqa: E402
+from prometheus_client import multiprocess  # noqa: E402
+import psutil  # noqa: E402
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+AUDIO_BUCKETS = (0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+LLM_TTFT = Histogram(
+    "agent_llm_ttft_seconds", "LLM time to first token", ["model", "mode"], buckets=LATENCY_BUCKETS
+)
+TTS_TTFB = Histogram(
+    "agent_tts_ttfb_seconds", "TTS time to first byte", ["model", "mode"], buckets=LATENCY_BUCKETS
+)
+EOU_DELAY = Histogram(
+    "agent_eou_delay_seconds", "End of utterance delay", ["model", "mode"], buckets=LATENCY_BUCKETS
+)
+STT_AUDIO_DURATION = Histogram(
+    "agent_stt_audio_duration_seconds", "Audio sent to STT per request", ["model"], buckets=AUDIO_BUCKETS
+)
+SESSION_START = Histogram(
+    "agent_session_start_seconds", "Job start until the session is running", ["mode"], buckets=LATENCY_BUCKETS
+)
+TOKENS = Counter("agent_tokens", "LLM tokens used", ["model", "kind"])
+CONTEXT_TOKENS = Histogram(
+    "agent_context_tokens",
+    "Estimated LLM prompt tokens before and after context compaction",
+    ["model", "stage"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+AUDIO_CACHE_LOOKUPS = Counter("agent_audio_cache_lookups", "Pre-synthesized audio cache lookups", ["result"])
+ANSWER_CACHE_LOOKUPS = Counter("agent_answer_cache_lookups", "Answer cache lookups", ["result"])
+ENDPOINTING_ERRORS = Counter(
+    "agent_endpointing_errors", "Turns ended too early (false_cut) or falsely interrupted (false_barge_in)", ["kind"]
+)
+TELEMETRY_DROPPED = Counter("agent_telemetry_dropped", "Telemetry records dropped because the writer fell behind")
+SPECULATION = Counter(
+    "agent_speculation", "Speculative LLM starts by outcome (hit, miss, restart, cancel)", ["result"]
+)
+SPECULATION_WASTED_TOKENS = Counter(
+    "agent_speculation_wasted_tokens", "Tokens spent on speculative LLM starts that were discarded", ["kind"]
+)
+HANDLER_ERRORS = Counter("agent_handler_errors", "Exceptions raised in session handlers", ["handler"])
+ACTIVE_SESSIONS = Gauge("agent_active_sessions", "Sessions currently running", multiprocess_mode="livesum")
+PUBLISH_QUEUE_DEPTH = Gauge(
+    "agent_publish_queue_depth", "Events waiting in data publishers", multiprocess_mode="livesum"
+)
+INFLIGHT_HANDLERS = Gauge(
+    "agent_inflight_handler_tasks", "Session handler tasks currently running", multiprocess_mode="livesum"
+)
+HANDLER_DURATION = Histogram(
+    "agent_handler_duration_seconds", "Session handler run time", ["handler"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+HANDLER_OVER_BUDGET = Counter(
+    "agent_handler_over_budget", "Session handler runs slower than the budget", ["handler"]
+)
+EVENT_LOOP_LAG = Gauge(
+    "agent_event_loop_lag_seconds", "Worst event-loop lag across job processes", multiprocess_mode="livemax"
+)
+
+# Aggregated view over all job processes, built on first use in the parent
+_aggregate_registry = None
+
+
+def reap_dead_processes():
+    """
+    Drop the live gauges of job processes that are gone.
+
+    Processes that crash or are killed never get to reset their loop lag or
+    active session count, which would otherwise be reported (and count as
+    load, see worker.py) forever.
+    """
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    for path in glob.glob(os.path.join(directory, "gauge_live*_*.db")):
+        pid = int(os.path.basename(path)[:-3].rsplit("_", 1)[1])
+        if not psutil.pid_exists(pid):
+            multiprocess.mark_process_dead(pid, directory)
+
+
+class _ReapingCollector(multiprocess.MultiProcessCollector):
+    def collect(self):
+        reap_dead_processes()
+        return super().collect()
+
+
+def _aggregate():
+    global _aggregate_registry
+    if _aggregate_registry is None:
+        _aggregate_registry = CollectorRegistry()
+        _ReapingCollector(_aggregate_registry)
+    return _aggregate_registry
+
+
+def observe_metrics(metrics_obj, model: str, mode: str = "pipeline"):
+    """Feed one MetricsCollectedEvent.metrics object into the exported series."""
+    # Matched by name so both the pipeline and realtime metric classes work
+    # across livekit-agents releases without importing them here.
+    name = type(metrics_obj).__name__
+    if name in ("LLMMetrics", "RealtimeModelMetrics"):
+        ttft = getattr(metrics_obj, "ttft", None)
+        if ttft is not None and ttft >= 0:
+            LLM_TTFT.labels(model=model, mode=mode).observe(ttft)
+        prompt = getattr(metrics_obj, "prompt_tokens", None) or getattr(metrics_obj, "input_tokens", 0)
+        completion = getattr(metrics_obj, "completion_tokens", None) or getattr(metrics_obj, "output_tokens", 0)
+        TOKENS.labels(model=model, kind="prompt").inc(prompt or 0)
+        TOKENS.labels(model=model, kind="completion").inc(completion or 0)
+    elif name == "TTSMetrics":
+        ttfb = getattr(metrics_obj, "ttfb", None)
+        if ttfb is not None and ttfb >= 0:
+            TTS_TTFB.labels(model=model, mode=mode).observe(ttfb)
+    elif name in ("EOUMetrics", "PipelineEOUMetrics"):
+        delay = getattr(metrics_obj, "end_of_utterance_delay", None)
+        if delay is not None:
+            EOU_DELAY.labels(model=model, mode=mode).observe(delay)
+    elif name == "STTMetrics":
+        duration = getattr(metrics_obj, "audio_duration", None)
+        if duration is not None:
+            STT_AUDIO_DURATION.labels(model=model).observe(duration)
+
+
+def start_metrics_server(port: int = None):
+    """Serve the aggregated metrics of this worker and its job processes."""
+    port = port or int(os.getenv("METRICS_PORT", "9100"))
+    start_http_server(port, registry=_aggregate())
+    return port
+
+
+def read_gauge(name: str) -> float:
+    """Current aggregated value of a gauge, as the endpoint would report it."""
+    for metric in _aggregate().collect():
+        if metric.name == name:
+            return sum(sample.value for sample in metric.samples)
+    return 0.0
+
+
+def current_loop_lag() -> float:
+    return read_gauge("agent_event_loop_lag_seconds")
@@ -0,0 +1,181 @@
+"""
+Event-loop lag and session handler instrumentation.
+
+Prometheus export is enabled by passing the exporter module as metrics=.
+"""
+import asyncio
+import inspect
+import logging
+import time
+
+logger = logging.getLogger("agent")
+
+
+class LoopLagMonitor:
+    """
+    Samples event-loop lag by measuring how late a periodic sleep wakes up.
+
+    lag is the most recent sample, max_lag the worst since start. If gauge
+    is given (anything with set(), e.g. a Prometheus Gauge) every sample is
+    written to it.
+    """
+
+    def __init__(self, interval=0.25, gauge=None):
+        self.interval = interval
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self._gauge = gauge
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.max_lag = max(self.max_lag, self.lag)
+            if self._gauge is not None:
+                self._gauge.set(self.lag)
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._gauge is not None:
+            self._gauge.set(0)
+
+
+class HandlerStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.over_budget = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, duration: float):
+        self.calls += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "over_budget": self.over_budget,
+            "mean": self.total / self.calls if self.calls else 0.0,
+            "max": self.max,
+        }
+
+
+class SessionInstrumentation:
+    """
+    Times every registered session handler and samples event-loop lag.
+
+    Sync handlers are timed inline. Async handlers are started as tracked
+    tasks (instead of bare create_task lambdas) so the number of in-flight
+    handler tasks is known and exceptions are never lost. Any handler
+    slower than budget seconds is logged and counted.
+    """
+
+    def __init__(self, budget=0.05, metrics=None):
+        self.budget = budget
+        self._metrics = metrics
+        self.handlers = {}
+        self.inflight = 0
+        self.max_inflight = 0
+        self._tasks = set()
+        self.loop_lag = LoopLagMonitor(gauge=metrics.EVENT_LOOP_LAG if metrics else None)
+
+    def start(self):
+        self.loop_lag.start()
+
+    def register(self, session, event: str, handler):
+        session.on(event, self.wrap(event, handler))
+
+    def wrap(self, name: str, handler):
+        stats = self.handlers.setdefault(name, HandlerStats())
+
+        if inspect.iscoroutinefunction(handler):
+            def start_task(*args):
+                task = asyncio.create_task(self._run_async(name, stats, handler, *args))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return start_task
+
+        def run_sync(*args):
+            start = time.perf_counter()
+            try:
+                return handler(*args)
+            except Exception as e:
+                self._record_error(name, stats, e)
+            finally:
+                self._record(name, stats, time.perf_counter() - start)
+        return run_sync
+
+    async def _run_async(self, name, stats, handler, *args):
+        self._set_inflight(1)
+        start = time.perf_counter()
+        try:
+            await handler(*args)
+        except Exception as e:
+            self._record_error(name, stats, e)
+        finally:
+            self._record(name, stats, time.perf_counter() - start)
+            self._set_inflight(-1)
+
+    def _set_inflight(self, delta: int):
+        self.inflight += delta
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        if self._metrics:
+            self._metrics.INFLIGHT_HANDLERS.inc(delta)
+
+    def _record(self, name, stats, duration):
+        stats.record(duration)
+        if self._metrics:
+            self._metrics.HANDLER_DURATION.labels(handler=name).observe(duration)
+        if duration > self.budget:
+            stats.over_budget += 1
+            if self._metrics:
+                self._metrics.HANDLER_OVER_BUDGET.labels(handler=name).inc()
+            logger.warning(f"🐢 Handler {name} took {duration * 1000:.1f}ms (budget {self.budget * 1000:.0f}ms)")
+
+    def _record_error(self, name, stats, error):
+        stats.errors += 1
+        if self._metrics:
+            self._metrics.HANDLER_ERRORS.labels(handler=name).inc()
+        logger.error(f"Unhandled error in {name} handler: {error}", exc_info=True)
+
+    def report(self) -> dict:
+        return {
+            "loop_lag": self.loop_lag.lag,
+            "max_loop_lag": self.loop_lag.max_lag,
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "handlers": {name: stats.as_dict() for name, stats in self.handlers.items()},
+        }
+
+    def log_report(self):
+        report = self.report()
+        logger.info(
+            f"🩺 Session instrumentation: max loop lag={report['max_loop_lag'] * 1000:.1f}ms "
+            f"max in-flight handlers={report['max_inflight']}"
+        )
+        for name, stats in report["handlers"].items():
+            logger.info(
+                f"   {name:<26} calls={stats['calls']:<5} mean={stats['mean'] * 1000:.2f}ms "
+                f"max={stats['max'] * 1000:.2f}ms over_budget={stats['over_budget']} errors={stats['errors']}"
+            )
+
+    async def aclose(self):
+        await self.loop_lag.aclose()
+        if self._metrics:
+            self._metrics.INFLIGHT_HANDLERS.dec(self.inflight)
+        self.log_report()
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import math
+
+from livekit.agents import metrics as agent_metrics
+
+logger = logging.getLogger("agent")
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class QuantileSketch:
+    """
+    Fixed-memory streaming quantile estimate over positive values.
+
+    Values are counted in logarithmic buckets so every reported quantile is
+    within relative_accuracy of the true value. Once max_buckets is reached
+    the lowest buckets are folded together, which only costs accuracy at the
+    fast end of the distribution we care least about.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=1024):
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._max_buckets = max_buckets
+        self._buckets = {}
+        self._zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        if value is None or value < 0 or math.isnan(value):
+            return
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        if value < 1e-9:
+            self._zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self._buckets[key] = self._buckets.get(key, 0) + 1
+        if len(self._buckets) > self._max_buckets:
+            lowest, second = sorted(self._buckets)[:2]
+            self._buckets[second] += self._buckets.pop(lowest)
+
+    def quantile(self, q: float):
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self._zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if rank < seen:
+                # Midpoint of the bucket (gamma^(key-1), gamma^key], which can lie above the largest value seen
+                return min(2 * self._gamma ** key / (self._gamma + 1), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        if self.count == 0:
+            return {"count": 0}
+        result = {"count": self.count, "mean": self.total / self.count, "max": self.max}
+        for q in QUANTILES:
+            result[f"p{int(q * 100)}"] = self.quantile(q)
+        return result
+
+
+# The realtime agent reports RealtimeModelMetrics instead of LLMMetrics
+LLM_METRICS_TYPES = tuple(
+    getattr(agent_metrics, name)
+    for name in ("LLMMetrics", "RealtimeModelMetrics")
+    if hasattr(agent_metrics, name)
+)
+
+# Older releases call it PipelineEOUMetrics, newer ones EOUMetrics
+EOU_METRICS_TYPES = tuple(
+    getattr(agent_metrics, name)
+    for name in ("EOUMetrics", "PipelineEOUMetrics")
+    if hasattr(agent_metrics, name)
+)
+
+
+class LatencyAggregator:
+    """
+    Latency distributions and token throughput for one session.
+
+    LiveKit runs each job in its own process, so there is nothing to
+    aggregate across sessions here: worker-wide latency comes from the
+    exporter histograms, which the worker's /metrics endpoint sums over
+    every job process.
+    """
+
+    SERIES = ("llm_ttft", "tts_ttfb", "eou_delay", "transcription_delay")
+
+    def __init__(self):
+        self.sketches = {name: QuantileSketch() for name in self.SERIES}
+        self.completion_tokens = 0
+        self.llm_duration = 0.0
+
+    def observe(self, metrics_obj):
+        if isinstance(metrics_obj, LLM_METRICS_TYPES):
+            self.sketches["llm_ttft"].add(getattr(metrics_obj, "ttft", None))
+            tokens = getattr(metrics_obj, "completion_tokens", None) or getattr(metrics_obj, "output_tokens", 0)
+            self.completion_tokens += tokens or 0
+            self.llm_duration += getattr(metrics_obj, "duration", 0) or 0
+        elif isinstance(metrics_obj, agent_metrics.TTSMetrics):
+            self.sketches["tts_ttfb"].add(getattr(metrics_obj, "ttfb", None))
+        elif isinstance(metrics_obj, EOU_METRICS_TYPES):
+            self.sketches["eou_delay"].add(getattr(metrics_obj, "end_of_utterance_delay", None))
+            self.sketches["transcription_delay"].add(getattr(metrics_obj, "transcription_delay", None))
+
+    def summary(self) -> dict:
+        result = {name: sketch.summary() for name, sketch in self.sketches.items()}
+        result["completion_tokens"] = self.completion_tokens
+        result["tokens_per_second"] = (
+            self.completion_tokens / self.llm_duration if self.llm_duration > 0 else None
+        )
+        return result
+
+    def log_summary(self, label: str):
+        logger.info(f"📈 {label} latency summary")
+        for name in self.SERIES:
+            s = self.sketches[name].summary()
+            if s["count"] == 0:
+                continue
+            logger.info(
+                f"   {name:<20} n={s['count']:<5} p50={s['p50']:.3f}s "
+                f"p90={s['p90']:.3f}s p99={s['p99']:.3f}s"
+            )
+        tps = self.summary()["tokens_per_second"]
+        if tps is not None:
+            logger.info(f"   completion tokens={self.completion_tokens} throughput={tps:.1f} tok/s")
+
+
+async def report_periodically(aggregator: LatencyAggregator, label: str, interval: float = 60.0):
+    """Log the aggregator's summary every interval seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        aggregator.log_summary(label)
@@ -0,0 +1,153 @@
+"""
+Microphone capture for the Streamlit client.
+
+The sounddevice callback runs on the audio thread and only copies the block
+into a preallocated int16 ring buffer. A single pump task on the room's
+event loop drains the ring in fixed 10/20 ms frames and hands them to the
+rtc.AudioSource, so there is no per-block coroutine, future or array
+allocation, and frames always have the same size whatever block size the
+device delivers.
+
+The ring is the bounded queue between the two: if the pump falls behind
+(e.g. under CPU load) the oldest whole frames are dropped and counted
+instead of growing latency without limit. The device can run at its native
+rate; frames are then resampled to the source rate in the pump.
+"""
+import asyncio
+import threading
+
+import numpy as np
+from livekit import rtc
+
+
+class MicCapture:
+    """
+    Feeds a sounddevice input stream into an rtc.AudioSource.
+
+    Open the stream with dtype="int16", channels=num_channels,
+    samplerate=device_rate and blocksize=capture.device_frame_samples, pass
+    capture.callback as its callback and run capture.run() on the loop
+    that owns the source.
+    """
+
+    def __init__(
+        self,
+        source: rtc.AudioSource,
+        loop: asyncio.AbstractEventLoop,
+        device_rate: int = None,
+        frame_ms: int = 20,
+        buffer_ms: int = 400,
+        prebuffer_frames: int = 1,
+    ):
+        if frame_ms not in (10, 20):
+            raise ValueError("frame_ms must be 10 or 20")
+        self.source = source
+        self.sample_rate = source.sample_rate
+        self.num_channels = source.num_channels
+        self.device_rate = device_rate or self.sample_rate
+        self.frame_ms = frame_ms
+        self.prebuffer_frames = prebuffer_frames
+        self._loop = loop
+
+        self.device_frame_samples = self.device_rate * frame_ms // 1000
+        self.frame_samples = self.sample_rate * frame_ms // 1000
+        # Whole frames only, so a frame never wraps around the end of the ring
+        self._ring_frames = max(2, buffer_ms // frame_ms)
+        self._ring = np.zeros(
+            (self._ring_frames * self.device_frame_samples, self.num_channels), dtype=np.int16
+        )
+        self._write = 0  # total samples written
+        self._read = 0  # total samples read
+        self._lock = threading.Lock()
+        self._wakeup = asyncio.Event()
+        self._waiting = False
+
+        # Reused for every frame handed to the source (it copies the data)
+        self._out = bytearray(self.frame_samples * self.num_channels * 2)
+        self._out_view = np.frombuffer(self._out, dtype=np.int16).reshape(-1, self.num_channels)
+        self._out_fill = 0
+        self._staging = bytearray(self.device_frame_samples * self.num_channels * 2)
+        self._staging_view = np.frombuffer(self._staging, dtype=np.int16).reshape(-1, self.num_channels)
+        self._resampler = (
+            rtc.AudioResampler(self.device_rate, self.sample_rate, num_channels=self.num_channels)
+            if self.device_rate != self.sample_rate
+            else None
+        )
+
+        self.stats = {"frames": 0, "overflows": 0, "dropped_frames": 0, "device_errors": 0, "max_buffered_ms": 0.0}
+
+    # ----------------- Audio thread -----------------
+    def callback(self, indata, frames, time, status):
+        if status:
+            self.stats["device_errors"] += 1
+        size = len(self._ring)
+        with self._lock:
+            start = self._write % size
+            first = min(frames, size - start)
+            self._ring[start:start + first] = indata[:first]
+            if first < frames:
+                self._ring[:frames - first] = indata[first:frames]
+            self._write += frames
+            overflow = self._write - self._read - size
+            if overflow > 0:
+                # Drop the oldest whole frames to make room
+                dropped = -(-overflow // self.device_frame_samples)
+                self._read += dropped * self.device_frame_samples
+                self.stats["overflows"] += 1
+                self.stats["dropped_frames"] += dropped
+            wake = self._waiting and self._write - self._read >= self.device_frame_samples
+            if wake:
+                self._waiting = False
+        if wake:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    # ----------------- Event loop -----------------
+    def _buffered(self) -> int:
+        with self._lock:
+            return self._write - self._read
+
+    async def _wait_for(self, samples: int):
+        while True:
+            with self._lock:
+                if self._write - self._read >= samples:
+                    return
+                self._waiting = True
+                self._wakeup.clear()
+            await self._wakeup.wait()
+
+    async def run(self):
+        """Pump frames from the ring into the source until cancelled."""
+        await self._wait_for(self.device_frame_samples * self.prebuffer_frames)
+        size = len(self._ring)
+        while True:
+            await self._wait_for(self.device_frame_samples)
+            buffered = self._buffered()
+            self.stats["max_buffered_ms"] = max(self.stats["max_buffered_ms"], buffered * 1000 / self.device_rate)
+            with self._lock:
+                start = self._read % size
+                chunk = self._ring[start:start + self.device_frame_samples]
+                np.copyto(self._out_view if self._resampler is None else self._staging_view, chunk)
+                self._read += self.device_frame_samples
+
+            if self._resampler is None:
+                await self._emit()
+                continue
+            frame = rtc.AudioFrame(self._staging, self.device_rate, self.num_channels, self.device_frame_samples)
+            for resampled in self._resampler.push(frame):
+                await self._push_resampled(resampled)
+
+    async def _push_resampled(self, frame: rtc.AudioFrame):
+        data = np.frombuffer(frame.data, dtype=np.int16).reshape(-1, self.num_channels)
+        while len(data):
+            take = min(len(data), self.frame_samples - self._out_fill)
+            self._out_view[self._out_fill:self._out_fill + take] = data[:take]
+            self._out_fill += take
+            data = data[take:]
+            if self._out_fill == self.frame_samples:
+                self._out_fill = 0
+                await self._emit()
+
+    async def _emit(self):
+        frame = rtc.AudioFrame(self._out, self.sample_rate, self.num_channels, self.frame_samples)
+        await self.source.capture_frame(frame)
+        self.stats["frames"] += 1
@@ -0,0 +1,132 @@
+"""
+Room placement for the token service.
+
+Callers that do not ask for a specific room are assigned one here, either a
+unique room per caller or the least occupied room of a sharded pool, so
+traffic spreads across rooms (and the agent jobs dispatched to them)
+instead of piling into a single room.
+
+Occupancy lives in a store object. MemoryOccupancyStore keeps it in this
+process; a shared backend (e.g. Redis) only needs the same six methods.
+"""
+import time
+import uuid
+from collections import deque
+
+from livekit import api
+
+
+class MemoryOccupancyStore:
+    """
+    In-memory room occupancy.
+
+    A caller counts as soon as a room is assigned (a reservation) so that
+    concurrent requests do not all pick the same room. Reservations become
+    occupants when the participant_joined webhook arrives and expire after
+    reservation_ttl seconds if it never does. Expired reservations are
+    dropped on every reserve(), so without webhooks (or for rooms nobody
+    joins) memory stays bounded by the reservations of the last ttl.
+    """
+
+    def __init__(self, reservation_ttl=60.0):
+        self.reservation_ttl = reservation_ttl
+        self._reservations = {}  # room -> {identity: expiry}
+        self._occupants = {}  # room -> set of identities
+        # (expiry, room, identity) in reservation order, so also in expiry order
+        self._expiries = deque()
+
+    def reserve(self, room: str, identity: str):
+        now = time.monotonic()
+        self._prune(now)
+        expiry = now + self.reservation_ttl
+        self._reservations.setdefault(room, {})[identity] = expiry
+        self._expiries.append((expiry, room, identity))
+
+    def _prune(self, now: float):
+        while self._expiries and self._expiries[0][0] <= now:
+            expiry, room, identity = self._expiries.popleft()
+            reservations = self._reservations.get(room)
+            # Skip reservations renewed or consumed since
+            if reservations is not None and reservations.get(identity) == expiry:
+                self._drop_reservation(room, identity)
+
+    def _drop_reservation(self, room: str, identity: str):
+        reservations = self._reservations.get(room)
+        if reservations is not None:
+            reservations.pop(identity, None)
+            if not reservations:
+                del self._reservations[room]
+
+    def join(self, room: str, identity: str):
+        self._drop_reservation(room, identity)
+        self._occupants.setdefault(room, set()).add(identity)
+
+    def leave(self, room: str, identity: str):
+        self._drop_reservation(room, identity)
+        occupants = self._occupants.get(room)
+        if occupants is not None:
+            occupants.discard(identity)
+            if not occupants:
+                del self._occupants[room]
+
+    def close(self, room: str):
+        self._reservations.pop(room, None)
+        self._occupants.pop(room, None)
+
+    def occupancy(self, room: str) -> int:
+        reservations = self._reservations.get(room)
+        if reservations:
+            now = time.monotonic()
+            for identity in [i for i, expiry in reservations.items() if expiry <= now]:
+                del reservations[identity]
+            if not reservations:
+                del self._reservations[room]
+        return len(self._occupants.get(room, ())) + len(self._reservations.get(room, ()))
+
+    def snapshot(self) -> dict:
+        rooms = set(self._reservations) | set(self._occupants)
+        return {room: self.occupancy(room) for room in sorted(rooms)}
+
+
+class RoomPlacer:
+    """
+    Assigns rooms to callers.
+
+    strategy="unique" gives every caller a fresh room. strategy="sharded"
+    picks the least occupied of pool_size rooms and overflows to a fresh
+    room once every pooled room has room_capacity callers.
+    """
+
+    def __init__(self, strategy="unique", pool_size=8, room_capacity=1, prefix="voice", store=None):
+        if strategy not in ("unique", "sharded"):
+            raise ValueError(f"Unknown placement strategy: {strategy}")
+        self.strategy = strategy
+        self.pool_size = pool_size
+        self.room_capacity = room_capacity
+        self.prefix = prefix
+        self.store = store or MemoryOccupancyStore()
+
+    def assign(self, identity: str) -> str:
+        room = None
+        if self.strategy == "sharded":
+            pool = [f"{self.prefix}-{i}" for i in range(self.pool_size)]
+            room = min(pool, key=self.store.occupancy)
+            if self.store.occupancy(room) >= self.room_capacity:
+                room = None
+        if room is None:
+            room = f"{self.prefix}-{uuid.uuid4().hex[:12]}"
+        self.store.reserve(room, identity)
+        return room
+
+    def handle_webhook(self, event):
+        """Update occupancy from a LiveKit WebhookEvent."""
+        room = event.room.name
+        # Agents joining their dispatched room do not count as callers
+        if event.participant.kind == api.ParticipantInfo.AGENT:
+            return
+        if event.event == "participant_joined":
+            self.store.join(room, event.participant.identity)
+        elif event.event == "participant_left":
+            self.store.leave(room, event.participant.identity)
+        elif event.event == "room_finished":
+            self.store.close(room)
@@ -7,4 +7,13 @@ If a user asks a question that doesn't require a search (like "hello" or "how ar
 
 WELCOME_MESSAGE = """
 Hello! I'm a voice assistant who can search Google for you. What would you like to know?
-"""
\ No newline at end of file
+"""
+
+# Used in realtime mode, where the native-audio model has no search tool
+REALTIME_INSTRUCTIONS = """You are a helpful voice AI assistant. The user is interacting with you via voice.
+Your responses are concise and friendly."""
+
+# Used to fold older turns into a running summary, see compaction.py
+SUMMARY_INSTRUCTIONS = """You compress the history of a voice conversation between a user and an assistant.
+Update the summary so far with the new conversation. Keep facts, names, numbers, the user's preferences and
+open questions; drop greetings and filler. Answer with the updated summary only, in at most 120 words."""
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import logging
+from collections import deque
+
+import wire
+
+logger = logging.getLogger("agent")
+
+# LiveKit drops reliable data packets above ~15 KiB, keep some headroom
+MAX_PACKET_BYTES = 14_000
+
+
+class DataPublisher:
+    """
+    Per-room publisher that batches data-channel events.
+
+    Handlers call publish() synchronously; events are queued and sent as a
+    single {"type": "batch", "events": [...]} packet every flush window.
+    Only the latest pending vad_update is kept, since older states are
+    superseded by the time the packet goes out. When the queue is full the
+    oldest event is dropped, so a slow data channel never builds up
+    unawaited tasks. Events that cannot be encoded are dropped and counted
+    as errors.
+
+    With encoding="binary" batches are packed with the compact format from
+    wire.py instead of JSON. If depth_gauge is given (anything with inc/dec,
+    e.g. a Prometheus Gauge) it tracks the number of queued events.
+    """
+
+    def __init__(
+        self,
+        room,
+        topic="agent_metrics",
+        flush_interval=0.075,
+        max_queue=256,
+        encoding="json",
+        depth_gauge=None,
+    ):
+        if encoding not in ("json", "binary"):
+            raise ValueError(f"Unknown encoding: {encoding}")
+        self._room = room
+        self._encoding = encoding
+        self._topic = topic
+        self._flush_interval = flush_interval
+        self._queue = deque()
+        self._max_queue = max_queue
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._closed = False
+        self._depth_gauge = depth_gauge
+        self._reported_depth = 0
+        self.stats = {
+            "enqueued": 0,
+            "merged": 0,
+            "dropped": 0,
+            "sent": 0,
+            "packets": 0,
+            "bytes": 0,
+            "errors": 0,
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def start(self):
+        """Start the flush loop. Call once the room is connected."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def publish(self, event: dict) -> bool:
+        """Queue an event for the next flush. Returns False if it was rejected."""
+        if self._closed:
+            self.stats["dropped"] += 1
+            return False
+
+        self.stats["enqueued"] += 1
+
+        if event.get("type") == "vad_update":
+            for i, pending in enumerate(self._queue):
+                if pending.get("type") == "vad_update":
+                    del self._queue[i]
+                    self.stats["merged"] += 1
+                    break
+
+        if len(self._queue) >= self._max_queue:
+            self._queue.popleft()
+            self.stats["dropped"] += 1
+
+        self._queue.append(event)
+        self._update_depth()
+        self._wakeup.set()
+        return True
+
+    async def _run(self):
+        while not self._closed:
+            await self._wakeup.wait()
+            # Let the flush window fill up before sending
+            await asyncio.sleep(self._flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        while self._queue:
+            events = self._take_batch()
+            if not events:
+                continue
+            if self._encoding == "binary":
+                payload = wire.pack_events(events)
+            else:
+                payload = ('{"type": "batch", "events": [' + ", ".join(events) + "]}").encode("utf-8")
+            try:
+                await self._room.local_participant.publish_data(payload, topic=self._topic)
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.stats["dropped"] += len(events)
+                logger.error(f"Error publishing data batch: {e}")
+                continue
+            self.stats["sent"] += len(events)
+            self.stats["packets"] += 1
+            self.stats["bytes"] += len(payload)
+
+    def _take_batch(self) -> list:
+        """Pop and encode queued events until the packet size limit is reached."""
+        events = []
+        size = 0
+        while self._queue and len(events) < wire.MAX_EVENTS_PER_PACKET:
+            try:
+                if self._encoding == "binary":
+                    encoded = wire.encode_event(self._queue[0])
+                else:
+                    encoded = json.dumps(self._queue[0])
+            except Exception as e:
+                event = self._queue.popleft()
+                self.stats["errors"] += 1
+                self.stats["dropped"] += 1
+                logger.error(f"Dropping event that cannot be encoded ({e!r}): {event.get('type')}")
+                continue
+            if events and size + len(encoded) > MAX_PACKET_BYTES:
+                break
+            self._queue.popleft()
+            events.append(encoded)
+            size += len(encoded) + 2
+        self._update_depth()
+        return events
+
+    def _update_depth(self):
+        if self._depth_gauge is None:
+            return
+        depth = len(self._queue)
+        self._depth_gauge.inc(depth - self._reported_depth)
+        self._reported_depth = depth
+
+    async def aclose(self):
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        logger.info(f"📦 Publisher stats: {self.stats}")
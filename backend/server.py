@@ -1,30 +1,79 @@
 import os
 import json # Import json
+import contextlib
+import logging
+import random
+import time
 from livekit import api
-from flask import Flask, request
 from dotenv import load_dotenv
-from flask_cors import CORS
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from placement import RoomPlacer
 
 load_dotenv(".env")
-app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}})
 
-@app.route("/get-token")
-def get_token():
-    identity = request.args.get("identity", "default-user")
-    room_name = request.args.get("room", "gemini-test-room")
-    # --- FEATURE 1: Get model from request ---
-    model = request.args.get("model", "gemini-2.5-flash-native-audio-preview-09-2025")
+# ----------------- Setup Logger -----------------
+logger = logging.getLogger("token-server")
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+handler.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(message)s", datefmt="%H:%M:%S"))
+logger.addHandler(handler)
+
+DEFAULT_MODEL = "gemini-2.5-flash-native-audio-preview-09-2025"
+
+# Fraction of requests that get a log line
+LOG_SAMPLE_RATE = float(os.getenv("TOKEN_LOG_SAMPLE_RATE", "0.01"))
+# Repeated identity/room/model/wire requests within this window reuse the same token
+TOKEN_MEMO_TTL = float(os.getenv("TOKEN_MEMO_TTL", "30"))
+TOKEN_MEMO_MAX = 10_000
+MAX_BULK_TOKENS = 500
+
+# ----------------- Credentials (read once at startup) -----------------
+API_KEY = os.getenv("LIVEKIT_API_KEY")
+API_SECRET = os.getenv("LIVEKIT_API_SECRET")
+
+# ----------------- Room Placement -----------------
+# Requests without a "room" parameter get a room from the placer:
+# ROOM_PLACEMENT=unique (one room per caller) or sharded (pool of rooms)
+placer = RoomPlacer(
+    strategy=os.getenv("ROOM_PLACEMENT", "unique"),
+    pool_size=int(os.getenv("ROOM_POOL_SIZE", "8")),
+    room_capacity=int(os.getenv("ROOM_CAPACITY", "1")),
+    prefix=os.getenv("ROOM_PREFIX", "voice"),
+)
+# When set, tokens explicitly dispatch this agent to the caller's room.
+# Must match the worker's AGENT_NAME (see worker.py).
+AGENT_NAME = os.getenv("AGENT_NAME", "")
+
+_memo = {}
+webhook_receiver = (
+    api.WebhookReceiver(api.TokenVerifier(API_KEY, API_SECRET)) if API_KEY and API_SECRET else None
+)
+
 
-    print(f"🔹 Received token request:")
-    print(f"   Identity: {identity}")
-    print(f"   Room: {room_name}")
-    print(f"   Model: {model}")
+def log_sampled(event: str, **fields):
+    if random.random() < LOG_SAMPLE_RATE:
+        logger.info(json.dumps({"event": event, **fields}))
 
-    metadata = json.dumps({"model": model})
-    print(f"✅ Metadata attached to token: {metadata}")
 
-    token = api.AccessToken(os.getenv("LIVEKIT_API_KEY"), os.getenv("LIVEKIT_API_SECRET")) \
+def issue_token(identity: str, room_name: str, model: str, wire: str) -> tuple:
+    """Return (token, room). room_name=None lets the placer pick the room."""
+    key = (identity, room_name, model, wire)
+    now = time.monotonic()
+    cached = _memo.get(key)
+    if cached and cached[2] > now:
+        return cached[0], cached[1]
+
+    if room_name is None:
+        room_name = placer.assign(identity)
+
+    metadata = json.dumps({"model": model, "wire": wire})
+    token = api.AccessToken(API_KEY, API_SECRET) \
         .with_identity(identity)\
         .with_name(identity)\
         .with_metadata(metadata)\
@@ -32,8 +81,94 @@ def get_token():
             room_join=True,
             room=room_name
         ))
-    
-    return {"token": token.to_jwt()}
+    if AGENT_NAME:
+        token = token.with_room_config(api.RoomConfiguration(
+            agents=[api.RoomAgentDispatch(agent_name=AGENT_NAME, metadata=metadata)]
+        ))
+    token = token.to_jwt()
+
+    if len(_memo) >= TOKEN_MEMO_MAX:
+        _memo.clear()
+    _memo[key] = (token, room_name, now + TOKEN_MEMO_TTL)
+    return token, room_name
+
+
+def read_params(params) -> tuple:
+    return (
+        params.get("identity", "default-user"),
+        params.get("room"),
+        # --- FEATURE 1: Get model from request ---
+        params.get("model", DEFAULT_MODEL),
+        # Data-channel encoding for agent_metrics: "json" (default) or "binary"
+        params.get("wire", "json"),
+    )
+
+
+async def get_token(request: Request):
+    identity, room_name, model, wire = read_params(request.query_params)
+    token, room_name = issue_token(identity, room_name, model, wire)
+    log_sampled("token_issued", identity=identity, room=room_name, model=model, wire=wire)
+    return JSONResponse({"token": token, "room": room_name})
+
+
+async def get_tokens(request: Request):
+    """Bulk issuance: {"requests": [{"identity", "room", "model", "wire"}, ...]}"""
+    try:
+        body = await request.json()
+        entries = body["requests"]
+    except (json.JSONDecodeError, KeyError, TypeError):
+        return JSONResponse({"error": "expected a JSON body with a 'requests' list"}, status_code=400)
+    if not isinstance(entries, list) or len(entries) > MAX_BULK_TOKENS:
+        return JSONResponse({"error": f"'requests' must be a list of at most {MAX_BULK_TOKENS}"}, status_code=400)
+
+    tokens = []
+    for entry in entries:
+        identity, room_name, model, wire = read_params(entry if isinstance(entry, dict) else {})
+        token, room_name = issue_token(identity, room_name, model, wire)
+        tokens.append({"identity": identity, "room": room_name, "token": token})
+    log_sampled("tokens_issued", count=len(tokens))
+    return JSONResponse({"tokens": tokens})
+
+
+async def get_rooms(request: Request):
+    """Current occupancy per assigned room."""
+    return JSONResponse({"strategy": placer.strategy, "rooms": placer.store.snapshot()})
+
+
+async def livekit_webhook(request: Request):
+    """LiveKit webhook target, keeps room occupancy up to date."""
+    if webhook_receiver is None:
+        return JSONResponse({"error": "webhooks need LiveKit credentials"}, status_code=503)
+    body = (await request.body()).decode("utf-8")
+    try:
+        event = webhook_receiver.receive(body, request.headers.get("Authorization", ""))
+    except Exception as e:
+        logger.warning(f"Rejected webhook: {e}")
+        return JSONResponse({"error": "invalid webhook"}, status_code=401)
+    placer.handle_webhook(event)
+    return JSONResponse({"ok": True})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    if not API_KEY or not API_SECRET:
+        logger.warning("LIVEKIT_API_KEY / LIVEKIT_API_SECRET are not set, token requests will fail")
+    logger.info(f"Token server ready (log sample rate {LOG_SAMPLE_RATE}, memo TTL {TOKEN_MEMO_TTL}s)")
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/get-token", get_token),
+        Route("/get-tokens", get_tokens, methods=["POST"]),
+        Route("/rooms", get_rooms),
+        Route("/livekit-webhook", livekit_webhook, methods=["POST"]),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan,
+)
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5001)
\ No newline at end of file
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=5001, access_log=False)
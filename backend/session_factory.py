@@ -0,0 +1,111 @@
+"""
+Builds the AgentSession for a job in realtime or pipeline mode.
+
+Realtime mode runs a Gemini native-audio model end to end (the setup the
+root agent.py used to have). Pipeline mode runs VAD + STT + search-grounded
+LLM + TTS. The mode follows the requested model unless the participant
+metadata sets "mode" explicitly; jobs without either use AGENT_MODE.
+
+Plugin clients are pooled per process and per model, so a job only pays
+client construction the first time a model is used; prewarm() builds the
+clients for the default models before any job arrives.
+"""
+import logging
+import os
+
+from google.genai import types
+from livekit.agents import AgentSession
+from livekit.plugins import google
+
+logger = logging.getLogger("agent")
+
+DEFAULT_PIPELINE_MODEL = "gemini-2.5-flash-lite-preview-06-17"
+DEFAULT_REALTIME_MODEL = "gemini-2.5-flash-native-audio-preview-09-2025"
+REALTIME_VOICE = "Puck"
+
+# Model names containing any of these only work with the Live API
+REALTIME_MODEL_MARKERS = ("native-audio", "-live")
+
+MODES = ("realtime", "pipeline")
+# Mode for jobs whose metadata names neither a model nor a mode
+DEFAULT_MODE = os.getenv("AGENT_MODE", "pipeline")
+
+
+def is_realtime_model(model: str) -> bool:
+    return any(marker in model for marker in REALTIME_MODEL_MARKERS)
+
+
+def resolve_mode(model: str = None, requested_mode: str = None) -> tuple:
+    """
+    Return (mode, model) for a job.
+
+    Without an explicit mode the model decides. When the requested mode
+    cannot run the requested model, that mode's default model is used.
+    """
+    if requested_mode not in MODES:
+        if requested_mode is not None:
+            logger.warning(f"Ignoring unknown mode: {requested_mode!r}")
+        if not model:
+            requested_mode = DEFAULT_MODE if DEFAULT_MODE in MODES else "pipeline"
+            return requested_mode, DEFAULT_REALTIME_MODEL if requested_mode == "realtime" else DEFAULT_PIPELINE_MODEL
+        requested_mode = "realtime" if is_realtime_model(model) else "pipeline"
+    default = DEFAULT_REALTIME_MODEL if requested_mode == "realtime" else DEFAULT_PIPELINE_MODEL
+    if not model:
+        return requested_mode, default
+    if is_realtime_model(model) != (requested_mode == "realtime"):
+        logger.warning(f"Model {model} cannot run in {requested_mode} mode, using {default}")
+        return requested_mode, default
+    return requested_mode, model
+
+
+class ClientPool:
+    """Per-process cache of constructed plugin clients, keyed by kind and model."""
+
+    def __init__(self):
+        self._clients = {}
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, kind: str, model: str, build):
+        key = (kind, model)
+        client = self._clients.get(key)
+        if client is None:
+            self.stats["misses"] += 1
+            client = self._clients[key] = build()
+            logger.info(f"🧩 Built {kind} client for {model}")
+        else:
+            self.stats["hits"] += 1
+        return client
+
+    def llm(self, model: str):
+        return self.get("llm", model, lambda: google.LLM(
+            model=model,
+            gemini_tools="google_search"  # Enable the Google Search tool
+        ))
+
+    def summarizer(self, model: str):
+        """Plain LLM client for background work such as context summaries, without the search tool."""
+        return self.get("summarizer", model, lambda: google.LLM(model=model))
+
+    def realtime(self, model: str):
+        return self.get("realtime", model, lambda: google.beta.realtime.RealtimeModel(
+            model=model,
+            voice=REALTIME_VOICE,
+            input_audio_transcription=types.RealtimeInputConfig(),
+        ))
+
+    def warm(self):
+        self.llm(DEFAULT_PIPELINE_MODEL)
+        self.realtime(DEFAULT_REALTIME_MODEL)
+
+
+def create_session(mode: str, model: str, userdata: dict) -> AgentSession:
+    """Build the AgentSession for mode from the clients prewarmed in userdata."""
+    pool = userdata["clients"]
+    if mode == "realtime":
+        return AgentSession(llm=pool.realtime(model))
+    return AgentSession(
+        vad=userdata["vad"],
+        stt=userdata["stt"],
+        llm=pool.llm(model),
+        tts=userdata["tts"],
+    )
@@ -0,0 +1,245 @@
+"""
+Speculative LLM turn start on interim transcripts.
+
+The pipeline only calls the LLM once the final transcript is in and the
+end-of-utterance decision has been made, so the grounded LLM's TTFT adds
+straight to the silence the caller hears. Speculator starts the answer
+earlier, on an interim transcript that looks like the end of the turn:
+
+  - the interim transcript has not changed for stable_after seconds, or
+  - the VAD says the user stopped speaking
+
+Speculation is restarted when a newer interim or the final transcript
+differs from the text it was started with in any word (case and
+punctuation are ignored: "in india" and "in china" are different
+questions), and cancelled when the user starts speaking again. When
+llm_node runs, the speculation is committed if its text matches the turn
+and the history has not changed since it started: its chunks are
+replayed and the rest streamed as it arrives. Otherwise it is cancelled
+and the turn runs normally.
+
+Cancelled speculations cost tokens; their prompt and completion tokens are
+counted as wasted (from the LLM's usage when it arrived, estimated
+otherwise). Hit rate, wasted tokens and the head start of hits are in
+stats and, when given, in Prometheus counters.
+"""
+import asyncio
+import logging
+import re
+import time
+
+from compaction import estimate_tokens
+from latency import QuantileSketch
+
+logger = logging.getLogger("agent")
+
+_WORD = re.compile(r"[\w']+")
+
+
+def words(text: str) -> list:
+    return _WORD.findall(text.lower())
+
+
+def same_turn(a: str, b: str) -> bool:
+    """Whether two transcripts are the same question for the LLM, ignoring case and punctuation."""
+    return words(a) == words(b)
+
+
+def history_key(items) -> str:
+    """Id of the item before the trailing user message, what a speculation was started after."""
+    if items and items[-1].type == "message" and items[-1].role == "user":
+        items = items[:-1]
+    return items[-1].id if items else None
+
+
+class Speculation:
+    """One speculative answer, buffered so it can be replayed from the start."""
+
+    def __init__(self, text: str, key: str, prompt_tokens: int, answer):
+        self.text = text
+        self.key = key
+        self.prompt_tokens = prompt_tokens
+        self.started_at = time.perf_counter()
+        self.chunks = []
+        self.completion_chars = 0
+        self.usage = None
+        self._updated = asyncio.Event()
+        self.task = asyncio.create_task(self._run(answer))
+        self.task.add_done_callback(lambda _: self._updated.set())
+
+    async def _run(self, answer):
+        async for chunk in answer:
+            self.chunks.append(chunk)
+            if isinstance(chunk, str):
+                self.completion_chars += len(chunk)
+            else:
+                if chunk.delta and chunk.delta.content:
+                    self.completion_chars += len(chunk.delta.content)
+                if chunk.usage is not None:
+                    self.usage = chunk.usage
+            self._updated.set()
+
+    def failed(self) -> bool:
+        return self.task.done() and (self.task.cancelled() or self.task.exception() is not None)
+
+    async def stream(self):
+        """Buffered chunks first, then the rest as it arrives."""
+        i = 0
+        while True:
+            if i < len(self.chunks):
+                yield self.chunks[i]
+                i += 1
+                continue
+            if self.task.done():
+                if self.failed() and not self.task.cancelled():
+                    raise self.task.exception()
+                return
+            self._updated.clear()
+            await self._updated.wait()
+
+    def wasted_tokens(self) -> tuple:
+        """(prompt, completion) tokens spent on this speculation."""
+        if self.usage is not None:
+            return self.usage.prompt_tokens, self.usage.completion_tokens
+        return self.prompt_tokens, self.completion_chars // 4
+
+    def cancel(self):
+        self.task.cancel()
+
+
+class Speculator:
+    """
+    Starts, restarts and commits speculative answers for one session.
+
+    bind() is given start(text) -> (chat_ctx, chunk iterator) by the agent,
+    see SearchAssistant. Feed it user_input_transcribed and
+    user_state_changed; llm_node calls take(). counter gets
+    .labels(result=...).inc() per started (hit, miss, restart, cancel),
+    wasted_counter gets .labels(kind="prompt"|"completion").inc(n).
+    """
+
+    def __init__(
+        self,
+        stable_after=0.3,
+        min_words=2,
+        counter=None,
+        wasted_counter=None,
+    ):
+        self.stable_after = stable_after
+        self.min_words = min_words
+        self._start = None
+        self._counter = counter
+        self._wasted_counter = wasted_counter
+        self._current = None
+        self._interim = ""
+        self._stable_timer = None
+        self._user_speaking = False
+        self.head_start = QuantileSketch()
+        self.stats = {
+            "started": 0,
+            "hits": 0,
+            "misses": 0,
+            "restarts": 0,
+            "cancelled": 0,
+            "wasted_prompt_tokens": 0,
+            "wasted_completion_tokens": 0,
+        }
+
+    def bind(self, start):
+        self._start = start
+
+    # ----------------- Session events -----------------
+    def on_transcript(self, text: str, is_final: bool):
+        if not text.strip():
+            return
+        self._interim = text
+        if self._stable_timer is not None:
+            self._stable_timer.cancel()
+            self._stable_timer = None
+        if is_final:
+            # Endpointing is pending, this is the text the turn will most likely end with
+            self._speculate(text)
+        else:
+            self._stable_timer = asyncio.get_running_loop().call_later(
+                self.stable_after, self._speculate, text
+            )
+
+    def on_user_state(self, state: str):
+        if state == "speaking":
+            self._user_speaking = True
+            if self._current is not None:
+                self._discard("cancel")
+        elif self._user_speaking:
+            self._user_speaking = False
+            if self._interim:
+                self._speculate(self._interim)
+
+    def _speculate(self, text: str):
+        self._stable_timer = None
+        if self._start is None or len(words(text)) < self.min_words:
+            return
+        if self._current is not None:
+            if same_turn(self._current.text, text) and not self._current.failed():
+                return
+            self._discard("restart")
+        chat_ctx, answer = self._start(text)
+        self._current = Speculation(text, history_key(chat_ctx.items), estimate_tokens(chat_ctx.items), answer)
+        self.stats["started"] += 1
+        logger.debug(f"🔮 Speculating on: \"{text}\"")
+
+    def _discard(self, result: str):
+        speculation, self._current = self._current, None
+        speculation.cancel()
+        self._count(result)
+        prompt, completion = speculation.wasted_tokens()
+        self.stats["wasted_prompt_tokens"] += prompt
+        self.stats["wasted_completion_tokens"] += completion
+        if self._wasted_counter is not None:
+            self._wasted_counter.labels(kind="prompt").inc(prompt)
+            self._wasted_counter.labels(kind="completion").inc(completion)
+
+    def _count(self, result: str):
+        key = {"hit": "hits", "miss": "misses", "restart": "restarts", "cancel": "cancelled"}[result]
+        self.stats[key] += 1
+        if self._counter is not None:
+            self._counter.labels(result=result).inc()
+
+    # ----------------- Commit -----------------
+    def take(self, chat_ctx, text: str):
+        """The speculative chunk stream if it answers this turn, else None (and it is cancelled)."""
+        self._interim = ""
+        speculation = self._current
+        if speculation is None:
+            return None
+        if (
+            speculation.failed()
+            or speculation.key != history_key(chat_ctx.items)
+            or not same_turn(speculation.text, text)
+        ):
+            self._discard("miss")
+            return None
+        self._current = None
+        self._count("hit")
+        self.head_start.add(time.perf_counter() - speculation.started_at)
+        return speculation
+
+    def hit_rate(self) -> float:
+        s = self.stats
+        resolved = s["hits"] + s["misses"] + s["restarts"] + s["cancelled"]
+        return s["hits"] / resolved if resolved else 0.0
+
+    def log_summary(self, label: str):
+        s = self.stats
+        head_start = self.head_start.quantile(0.5)
+        head_start = f"{head_start * 1000:.0f}ms" if head_start is not None else "n/a"
+        logger.info(
+            f"🔮 {label} speculation: started={s['started']} hits={s['hits']} misses={s['misses']} "
+            f"restarts={s['restarts']} cancelled={s['cancelled']} hit_rate={self.hit_rate() * 100:.0f}% "
+            f"head_start_p50={head_start} wasted_tokens={s['wasted_prompt_tokens']}+{s['wasted_completion_tokens']}"
+        )
+
+    async def aclose(self):
+        if self._stable_timer is not None:
+            self._stable_timer.cancel()
+        if self._current is not None:
+            self._discard("cancel")
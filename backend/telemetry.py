@@ -0,0 +1,269 @@
+"""
+Durable session telemetry: per-turn records written to rotating files.
+
+Handlers call TelemetrySink.record() synchronously; records are buffered
+and handed to a worker thread in batches every flush window, so the event
+loop never waits on the disk. Files rotate once they reach max_file_bytes
+and every session closes its last file on shutdown.
+
+Every record has the columns in TELEMETRY_SCHEMA (missing ones are null):
+one row per LLM, TTS, STT and end-of-utterance metric, per transcript and
+reply (if the agent records them), and a "usage" row with the session's
+UsageCollector summary when it ends. analyze_telemetry.py reads the files
+back. Nothing here deletes old files.
+
+Records are written as JSON lines, or as Parquet with file_format="parquet"
+when pyarrow is installed (it is optional, without it the sink falls back
+to JSON lines).
+"""
+import asyncio
+import collections
+import dataclasses
+import json
+import logging
+import os
+import time
+
+from livekit.agents import metrics as agent_metrics
+
+from latency import EOU_METRICS_TYPES, LLM_METRICS_TYPES
+
+logger = logging.getLogger("agent")
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# (column, type) of every record, also the Parquet schema
+TELEMETRY_SCHEMA = [
+    ("ts", "float"),
+    ("session", "string"),
+    ("room", "string"),
+    ("mode", "string"),
+    ("model", "string"),
+    ("kind", "string"),
+    ("speech_id", "string"),
+    ("ttft", "float"),
+    ("ttfb", "float"),
+    ("duration", "float"),
+    ("prompt_tokens", "int"),
+    ("prompt_cached_tokens", "int"),
+    ("completion_tokens", "int"),
+    ("characters", "int"),
+    ("audio_duration", "float"),
+    ("stt_audio_duration", "float"),
+    ("end_of_utterance_delay", "float"),
+    ("transcription_delay", "float"),
+    ("role", "string"),
+    ("text", "string"),
+]
+TELEMETRY_COLUMNS = [name for name, _ in TELEMETRY_SCHEMA]
+
+# Parquet row groups are written once this many rows are pending
+PARQUET_ROW_GROUP = 10_000
+
+
+def metrics_record(metrics_obj) -> dict:
+    """Telemetry columns of an agent metrics object, keyed by metric kind."""
+    get = lambda attr: getattr(metrics_obj, attr, None)
+    if isinstance(metrics_obj, LLM_METRICS_TYPES):
+        # RealtimeModelMetrics counts input/output tokens instead
+        pipeline = isinstance(metrics_obj, agent_metrics.LLMMetrics)
+        return {
+            "kind": "llm",
+            "speech_id": get("speech_id"),
+            "ttft": get("ttft"),
+            "duration": get("duration"),
+            "prompt_tokens": get("prompt_tokens") if pipeline else get("input_tokens"),
+            "prompt_cached_tokens": get("prompt_cached_tokens"),
+            "completion_tokens": get("completion_tokens") if pipeline else get("output_tokens"),
+        }
+    if isinstance(metrics_obj, agent_metrics.TTSMetrics):
+        return {
+            "kind": "tts",
+            "speech_id": get("speech_id"),
+            "ttfb": get("ttfb"),
+            "duration": get("duration"),
+            "characters": get("characters_count"),
+            "audio_duration": get("audio_duration"),
+        }
+    if isinstance(metrics_obj, agent_metrics.STTMetrics):
+        return {"kind": "stt", "duration": get("duration"), "stt_audio_duration": get("audio_duration")}
+    if isinstance(metrics_obj, EOU_METRICS_TYPES):
+        return {
+            "kind": "eou",
+            "speech_id": get("speech_id"),
+            "end_of_utterance_delay": get("end_of_utterance_delay"),
+            "transcription_delay": get("transcription_delay"),
+        }
+    return None
+
+
+def usage_record(summary, duration: float) -> dict:
+    """A "usage" row from a UsageCollector summary."""
+    usage = dataclasses.asdict(summary)
+    return {
+        "kind": "usage",
+        "duration": duration,
+        "prompt_tokens": usage.get("llm_prompt_tokens"),
+        "prompt_cached_tokens": usage.get("llm_prompt_cached_tokens"),
+        "completion_tokens": usage.get("llm_completion_tokens"),
+        "characters": usage.get("tts_characters_count"),
+        "audio_duration": usage.get("tts_audio_duration"),
+        "stt_audio_duration": usage.get("stt_audio_duration"),
+    }
+
+
+class RotatingFileWriter:
+    """Appends batches to {prefix}-{n}.{ext} files, starting a new one past max_bytes. Runs in a worker thread."""
+
+    def __init__(self, directory: str, prefix: str, file_format="jsonl", max_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.prefix = prefix
+        self.format = file_format
+        self.max_bytes = max_bytes
+        self.files = []
+        self._file = None
+        self._parquet = None
+        self._rows = []
+        self._size = 0
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{self.prefix}-{len(self.files):04d}.{self.format}")
+        self.files.append(path)
+        self._size = 0
+        if self.format == "parquet":
+            schema = pa.schema([
+                (name, {"float": pa.float64(), "int": pa.int64(), "string": pa.string()}[kind])
+                for name, kind in TELEMETRY_SCHEMA
+            ])
+            self._parquet = pq.ParquetWriter(path, schema, compression="zstd")
+        else:
+            self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, records: list):
+        if self._file is None and self._parquet is None:
+            self._open()
+        if self.format == "parquet":
+            self._rows.extend(records)
+            if len(self._rows) >= PARQUET_ROW_GROUP:
+                self._write_row_group()
+        else:
+            data = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+        if self._size >= self.max_bytes:
+            self.close()
+
+    def _write_row_group(self):
+        columns = {name: [row.get(name) for row in self._rows] for name in TELEMETRY_COLUMNS}
+        self._parquet.write_table(pa.table(columns, schema=self._parquet.schema))
+        self._rows = []
+        self._size = os.path.getsize(self.files[-1])
+
+    def close(self):
+        if self._parquet is not None:
+            if self._rows:
+                self._write_row_group()
+            self._parquet.close()
+            self._parquet = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class TelemetrySink:
+    """
+    Per-session buffered telemetry writer.
+
+    context (session, room, mode, model) is added to every record. When more
+    than max_buffer records are waiting the oldest are dropped and counted
+    in stats and, if given, dropped_counter (anything with inc()).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str,
+        context: dict,
+        file_format="jsonl",
+        flush_interval=1.0,
+        max_buffer=50_000,
+        max_file_bytes=64 * 1024 * 1024,
+        dropped_counter=None,
+    ):
+        if file_format not in ("jsonl", "parquet"):
+            raise ValueError(f"Unknown telemetry format: {file_format}")
+        if file_format == "parquet" and pq is None:
+            logger.warning("pyarrow is not installed, writing telemetry as JSON lines")
+            file_format = "jsonl"
+        self._writer = RotatingFileWriter(directory, prefix, file_format, max_file_bytes)
+        self._context = {name: None for name in TELEMETRY_COLUMNS}
+        self._context.update(context)
+        self._flush_interval = flush_interval
+        self._max_buffer = max_buffer
+        self._buffer = collections.deque()
+        self._lock = asyncio.Lock()
+        self._stop = asyncio.Event()
+        self._task = None
+        self._closed = False
+        self._dropped_counter = dropped_counter
+        self.stats = {"recorded": 0, "written": 0, "dropped": 0, "batches": 0, "errors": 0}
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def record(self, fields: dict) -> bool:
+        """Buffer one record for the next flush. Returns False if it was rejected."""
+        if self._closed or fields is None:
+            return False
+        record = dict(self._context, ts=time.time())
+        record.update(fields)
+        if len(self._buffer) >= self._max_buffer:
+            self._buffer.popleft()
+            self.stats["dropped"] += 1
+            if self._dropped_counter is not None:
+                self._dropped_counter.inc()
+        self._buffer.append(record)
+        self.stats["recorded"] += 1
+        return True
+
+    async def _run(self):
+        # Never cancelled mid-write, aclose() sets _stop and waits for the last flush
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            if not self._buffer:
+                return
+            batch = list(self._buffer)
+            self._buffer.clear()
+            try:
+                await asyncio.to_thread(self._writer.write, batch)
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.stats["dropped"] += len(batch)
+                logger.error(f"Error writing telemetry batch: {e}")
+                return
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+
+    async def aclose(self):
+        self._closed = True
+        self._stop.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+        await asyncio.to_thread(self._writer.close)
+        logger.info(f"🗄️  Telemetry stats: {self.stats} files={self._writer.files}")
@@ -0,0 +1,139 @@
+"""
+Compact binary wire format for the agent_metrics data topic.
+
+JSON packets always start with "{", binary packets start with the version
+byte, so clients can tell them apart by sniffing the first byte.
+
+Packet:  u8 version | u8 event count | events...
+Event:   u8 kind | u8 field count | fields...
+Field:   u8 field id | u8 value tag | value
+
+metrics_update events are flattened: "metric_type" plus the keys of the
+nested "data" dict are written as fields of the event and nested again on
+decode. Keep the id tables in sync with frontend/src/wire.js.
+"""
+import struct
+
+WIRE_VERSION = 1
+MAX_EVENTS_PER_PACKET = 255
+
+KINDS = ["vad_update", "transcript_update", "metrics_update", "user_transcript", "agent_chunk"]
+METRIC_TYPES = ["stt", "llm", "tts", "vad", "eou", "audio_cache", "context"]
+FIELDS = [
+    "metric_type",
+    "timestamp",
+    "ttft",
+    "ttfb",
+    "total_tokens",
+    "prompt_tokens",
+    "completion_tokens",
+    "tokens_per_second",
+    "audio_duration",
+    "end_of_utterance_delay",
+    "transcription_delay",
+    "label",
+    "status",
+    "transcript",
+    "speaker",
+    "text",
+    "is_final",
+    "hits",
+    "misses",
+    "tokens_before",
+    "tokens_after",
+]
+
+KIND_IDS = {name: i + 1 for i, name in enumerate(KINDS)}
+METRIC_TYPE_IDS = {name: i + 1 for i, name in enumerate(METRIC_TYPES)}
+FIELD_IDS = {name: i + 1 for i, name in enumerate(FIELDS)}
+
+TAG_F64 = 1
+TAG_U32 = 2
+TAG_STR = 3
+TAG_TRUE = 4
+TAG_FALSE = 5
+TAG_METRIC_TYPE = 6
+
+_HEADER = struct.Struct("<BB")
+_F64 = struct.Struct("<BBd")
+_U32 = struct.Struct("<BBI")
+_STR = struct.Struct("<BBH")
+
+
+def _encode_field(name, value) -> bytes:
+    field_id = FIELD_IDS[name]
+    if name == "metric_type":
+        return _HEADER.pack(field_id, TAG_METRIC_TYPE) + bytes((METRIC_TYPE_IDS[value],))
+    if isinstance(value, bool):
+        return _HEADER.pack(field_id, TAG_TRUE if value else TAG_FALSE)
+    if isinstance(value, int) and 0 <= value <= 0xFFFFFFFF:
+        return _U32.pack(field_id, TAG_U32, value)
+    if isinstance(value, (int, float)):
+        return _F64.pack(field_id, TAG_F64, value)
+    raw = str(value).encode("utf-8")
+    if len(raw) > 0xFFFF:
+        # Cut on a character boundary, a split multi-byte character would not decode
+        raw = raw[:0xFFFF].decode("utf-8", "ignore").encode("utf-8")
+    return _STR.pack(field_id, TAG_STR, len(raw)) + raw
+
+
+def encode_event(event: dict) -> bytes:
+    """Encode one event. Unknown keys and None values are skipped."""
+    items = [(k, v) for k, v in event.items() if k != "type" and k != "data"]
+    items.extend((event.get("data") or {}).items())
+    fields = [_encode_field(k, v) for k, v in items if v is not None and k in FIELD_IDS]
+    return _HEADER.pack(KIND_IDS[event["type"]], len(fields)) + b"".join(fields)
+
+
+def pack_events(encoded_events: list) -> bytes:
+    """Join events produced by encode_event() into one packet."""
+    return _HEADER.pack(WIRE_VERSION, len(encoded_events)) + b"".join(encoded_events)
+
+
+def encode_packet(events: list) -> bytes:
+    return pack_events([encode_event(e) for e in events])
+
+
+def decode_packet(data: bytes) -> list:
+    """Decode a binary packet back into the same dicts the JSON path sends."""
+    version, count = _HEADER.unpack_from(data, 0)
+    if version != WIRE_VERSION:
+        raise ValueError(f"Unsupported wire version: {version}")
+    offset = _HEADER.size
+    events = []
+    for _ in range(count):
+        kind_id, field_count = _HEADER.unpack_from(data, offset)
+        offset += _HEADER.size
+        kind = KINDS[kind_id - 1]
+        event = {"type": kind}
+        target = event
+        if kind == "metrics_update":
+            target = event["data"] = {}
+        for _ in range(field_count):
+            field_id, tag = _HEADER.unpack_from(data, offset)
+            offset += _HEADER.size
+            name = FIELDS[field_id - 1]
+            if tag == TAG_F64:
+                (value,) = struct.unpack_from("<d", data, offset)
+                offset += 8
+            elif tag == TAG_U32:
+                (value,) = struct.unpack_from("<I", data, offset)
+                offset += 4
+            elif tag == TAG_STR:
+                (length,) = struct.unpack_from("<H", data, offset)
+                offset += 2
+                value = bytes(data[offset:offset + length]).decode("utf-8")
+                offset += length
+            elif tag == TAG_TRUE or tag == TAG_FALSE:
+                value = tag == TAG_TRUE
+            elif tag == TAG_METRIC_TYPE:
+                value = METRIC_TYPES[data[offset] - 1]
+                offset += 1
+            else:
+                raise ValueError(f"Unknown field tag: {tag}")
+            if name == "metric_type":
+                event["metric_type"] = value
+            else:
+                target[name] = value
+        events.append(event)
+    return events
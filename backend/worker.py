@@ -0,0 +1,70 @@
+"""
+Worker launcher with explicit pool sizing and load reporting.
+
+LiveKit runs one job per child process, so the process pool size is the
+number of concurrent jobs a host accepts. That limit is enforced through
+the load we report to the dispatcher: once load reaches LOAD_THRESHOLD the
+worker is marked full and stops receiving jobs.
+
+Settings (environment variables):
+    NUM_IDLE_PROCESSES   prewarmed processes kept ready for new jobs
+    MAX_JOBS_PER_CORE    concurrent jobs allowed per CPU core
+    MAX_JOBS             hard cap on concurrent jobs (overrides the per-core limit)
+    LOAD_THRESHOLD       load at which the worker stops accepting jobs
+    LOOP_LAG_BUDGET      event-loop lag (seconds) that counts as fully loaded
+    AGENT_NAME           if set, the worker only takes explicitly dispatched jobs
+                         (the token service adds the dispatch, see placement.py)
+"""
+import logging
+import os
+
+import psutil
+from livekit.agents import JobExecutorType, WorkerOptions
+
+logger = logging.getLogger("agent")
+
+NUM_IDLE_PROCESSES = int(os.getenv("NUM_IDLE_PROCESSES", "2"))
+MAX_JOBS_PER_CORE = float(os.getenv("MAX_JOBS_PER_CORE", "2"))
+MAX_JOBS = int(os.getenv("MAX_JOBS", "0")) or max(1, int((os.cpu_count() or 1) * MAX_JOBS_PER_CORE))
+LOAD_THRESHOLD = float(os.getenv("LOAD_THRESHOLD", "0.75"))
+LOOP_LAG_BUDGET = float(os.getenv("LOOP_LAG_BUDGET", "0.1"))
+AGENT_NAME = os.getenv("AGENT_NAME", "")
+
+
+def make_load_fnc(loop_lag_fn=None):
+    """
+    Build a load function combining CPU, job count and event-loop lag.
+
+    The reported load is the highest of the three ratios, so any single
+    resource running out is enough to stop new jobs. The job ratio is scaled
+    so that it reaches LOAD_THRESHOLD at exactly MAX_JOBS active jobs.
+    """
+    psutil.cpu_percent(interval=None)  # first call only primes the counter
+
+    def load_fnc(worker) -> float:
+        cpu = psutil.cpu_percent(interval=None) / 100.0
+        jobs = len(worker.active_jobs) / MAX_JOBS * LOAD_THRESHOLD
+        lag = loop_lag_fn() / LOOP_LAG_BUDGET if loop_lag_fn else 0.0
+        return min(1.0, max(cpu, jobs, lag))
+
+    return load_fnc
+
+
+def make_worker_options(entrypoint_fnc, prewarm_fnc=None, loop_lag_fn=None) -> WorkerOptions:
+    """WorkerOptions with the pool settings above; loop_lag_fn returns the current lag in seconds."""
+    logger.info(
+        f"⚙️  Worker pool: max_jobs={MAX_JOBS} idle_processes={NUM_IDLE_PROCESSES} "
+        f"load_threshold={LOAD_THRESHOLD} loop_lag_budget={LOOP_LAG_BUDGET}s"
+    )
+    options = {
+        "entrypoint_fnc": entrypoint_fnc,
+        "job_executor_type": JobExecutorType.PROCESS,
+        "num_idle_processes": NUM_IDLE_PROCESSES,
+        "load_fnc": make_load_fnc(loop_lag_fn),
+        "load_threshold": LOAD_THRESHOLD,
+    }
+    if prewarm_fnc is not None:
+        options["prewarm_fnc"] = prewarm_fnc
+    if AGENT_NAME:
+        options["agent_name"] = AGENT_NAME
+    return WorkerOptions(**options)
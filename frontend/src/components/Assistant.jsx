@@ -3,6 +3,7 @@ import { LiveKitRoom, RoomAudioRenderer, RoomContext } from '@livekit/components
 import { RoomEvent } from 'livekit-client';
 import VoiceUI from './VoiceUI';
 import MetricsDisplay from './MetricsDisplay'; // Import the new component
+import { decodePacket, isBinaryPacket } from '../wire';
 
 // This helper component is a good pattern and remains unchanged.
 const RoomManager = ({ onDataReceived }) => {
@@ -30,10 +31,10 @@ export default function Assistant({ setShowAssistant, selectedModel }) {
   const getToken = useCallback(async () => {
     try {
       const identity = `user-${Math.floor(Math.random() * 10000)}`;
-      const room = "gemini-test-room";
+      // No room parameter: the token service assigns one
       const url = `http://localhost:5001/get-token?identity=${encodeURIComponent(
         identity
-      )}&room=${encodeURIComponent(room)}&model=${encodeURIComponent(selectedModel)}`;
+      )}&model=${encodeURIComponent(selectedModel)}&wire=binary`;
       const response = await fetch(url);
       const data = await response.json();
       setToken(data.token);
@@ -47,29 +48,43 @@ export default function Assistant({ setShowAssistant, selectedModel }) {
   }, [getToken]);
 
   // 2. Revise the data handling logic to aggregate state.
+  const handleMessage = useCallback((message) => {
+    if (message.type === "vad_update") {
+      setVadStatus(message.status);
+    } else if (message.type === "transcript_update") {
+      // Handle transcript updates separately
+      setTranscript(message.transcript);
+    } else if (message.type === "metrics_update") {
+      // Use the functional form of setState to merge new metrics
+      // with the previous state.
+      setMetrics(prevMetrics => ({
+        ...prevMetrics,
+        [message.metric_type]: message.data,
+      }));
+    }
+  }, []);
+
   const onDataReceived = useCallback((payload) => {
     try {
+      if (isBinaryPacket(payload)) {
+        decodePacket(payload).forEach(handleMessage);
+        return;
+      }
+
       const decoder = new TextDecoder();
       const message = JSON.parse(decoder.decode(payload));
 
       console.log("📩 Data received:", message);
 
-      if (message.type === "vad_update") {
-        setVadStatus(message.status);
-      } else if (message.type === "transcript_update") {
-        // Handle transcript updates separately
-        setTranscript(message.transcript);
-      } else if (message.type === "metrics_update") {
-        // Use the functional form of setState to merge new metrics
-        // with the previous state.
-        setMetrics(prevMetrics => ({
-          ...prevMetrics,
-          [message.metric_type]: message.data,
-        }));
+      // The agent batches events into one packet per flush window
+      if (message.type === "batch") {
+        message.events.forEach(handleMessage);
+      } else {
+        handleMessage(message);
       }
     } catch (err)    { console.error("Error parsing incoming data:", err);
     }
-  }, []);
+  }, [handleMessage]);
 
 
   if (!token) {
@@ -13,7 +13,7 @@ const formatTimestamp = (ts) => {
 
 export default function MetricsDisplay({ metrics, transcript }) {
   // Destructure the metrics object for easier access
-  const { vad, eou, llm, tts } = metrics;
+  const { vad, eou, llm, tts, audio_cache, context } = metrics;
 
   return (
     <div className="metrics-display-container">
@@ -64,6 +64,23 @@ export default function MetricsDisplay({ metrics, transcript }) {
           <p>Start Time: {formatTimestamp(tts.timestamp)}</p>
         </div>
       )}
+
+      {/* Audio Cache */}
+      {audio_cache && (
+        <div className="metric-group">
+          <h4>Audio Cache</h4>
+          <p>Hits: {audio_cache.hits}</p>
+          <p>Misses: {audio_cache.misses}</p>
+        </div>
+      )}
+
+      {/* Context Compaction */}
+      {context && (
+        <div className="metric-group">
+          <h4>LLM Context</h4>
+          <p>Prompt Tokens: ~{context.tokens_before} → ~{context.tokens_after}</p>
+        </div>
+      )}
     </div>
   );
 }
\ No newline at end of file
@@ -0,0 +1,100 @@
+// Decoder for the compact binary agent_metrics format.
+// Keep the id tables in sync with backend/wire.py.
+
+const WIRE_VERSION = 1;
+
+const KINDS = ["vad_update", "transcript_update", "metrics_update", "user_transcript", "agent_chunk"];
+const METRIC_TYPES = ["stt", "llm", "tts", "vad", "eou", "audio_cache", "context"];
+const FIELDS = [
+  "metric_type",
+  "timestamp",
+  "ttft",
+  "ttfb",
+  "total_tokens",
+  "prompt_tokens",
+  "completion_tokens",
+  "tokens_per_second",
+  "audio_duration",
+  "end_of_utterance_delay",
+  "transcription_delay",
+  "label",
+  "status",
+  "transcript",
+  "speaker",
+  "text",
+  "is_final",
+  "hits",
+  "misses",
+  "tokens_before",
+  "tokens_after",
+];
+
+const TAG_F64 = 1;
+const TAG_U32 = 2;
+const TAG_STR = 3;
+const TAG_TRUE = 4;
+const TAG_FALSE = 5;
+const TAG_METRIC_TYPE = 6;
+
+const textDecoder = new TextDecoder();
+
+// JSON packets start with "{", binary packets with the version byte
+export const isBinaryPacket = (payload) => payload.length > 0 && payload[0] !== 0x7b;
+
+export function decodePacket(payload) {
+  const view = new DataView(payload.buffer, payload.byteOffset, payload.byteLength);
+  const version = view.getUint8(0);
+  if (version !== WIRE_VERSION) {
+    throw new Error(`Unsupported wire version: ${version}`);
+  }
+  const count = view.getUint8(1);
+  let offset = 2;
+  const events = [];
+
+  for (let i = 0; i < count; i++) {
+    const kind = KINDS[view.getUint8(offset) - 1];
+    const fieldCount = view.getUint8(offset + 1);
+    offset += 2;
+
+    const event = { type: kind };
+    let target = event;
+    if (kind === "metrics_update") {
+      event.data = {};
+      target = event.data;
+    }
+
+    for (let f = 0; f < fieldCount; f++) {
+      const name = FIELDS[view.getUint8(offset) - 1];
+      const tag = view.getUint8(offset + 1);
+      offset += 2;
+      let value;
+      if (tag === TAG_F64) {
+        value = view.getFloat64(offset, true);
+        offset += 8;
+      } else if (tag === TAG_U32) {
+        value = view.getUint32(offset, true);
+        offset += 4;
+      } else if (tag === TAG_STR) {
+        const length = view.getUint16(offset, true);
+        offset += 2;
+        value = textDecoder.decode(payload.subarray(offset, offset + length));
+        offset += length;
+      } else if (tag === TAG_TRUE || tag === TAG_FALSE) {
+        value = tag === TAG_TRUE;
+      } else if (tag === TAG_METRIC_TYPE) {
+        value = METRIC_TYPES[view.getUint8(offset) - 1];
+        offset += 1;
+      } else {
+        throw new Error(`Unknown field tag: ${tag}`);
+      }
+
+      if (name === "metric_type") {
+        event.metric_type = value;
+      } else {
+        target[name] = value;
+      }
+    }
+    events.push(event);
+  }
+  return events;
+}
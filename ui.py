@@ -3,18 +3,30 @@ import json
 import os
 import threading
 from dotenv import load_dotenv
+import httpx
 import streamlit as st
 import sounddevice as sd
-import numpy as np
 
 from livekit import rtc
-from livekit.api import AccessToken, VideoGrants
+
+from backend.conversation import ConversationStore
+from backend.mic_capture import MicCapture
+from backend.wire import decode_packet
 
 load_dotenv(".env")
 LIVEKIT_URL = os.environ.get("LIVEKIT_URL")
-LIVEKIT_API_KEY = os.environ.get("LIVEKIT_API_KEY")
-LIVEKIT_API_SECRET = os.environ.get("LIVEKIT_API_SECRET")
-KEYS_LOADED = LIVEKIT_URL and LIVEKIT_API_KEY and LIVEKIT_API_SECRET
+KEYS_LOADED = bool(LIVEKIT_URL)
+# Tokens come from the token service (backend/server.py), which picks the
+# room and dispatches the agent to it. LIVEKIT_ROOM pins a room, AGENT_MODEL
+# picks the model (the service's default otherwise).
+TOKEN_SERVER_URL = os.environ.get("TOKEN_SERVER_URL", "http://localhost:5001")
+ROOM_NAME = os.environ.get("LIVEKIT_ROOM")
+AGENT_MODEL = os.environ.get("AGENT_MODEL")
+# Mic frames sent to the room, 10 or 20 ms
+MIC_FRAME_MS = int(os.environ.get("MIC_FRAME_MS", "20"))
+# The chat redraws at most this often (seconds), and only shows the last CHAT_WINDOW messages
+CHAT_FRAME_BUDGET = float(os.environ.get("CHAT_FRAME_BUDGET", "0.1"))
+CHAT_WINDOW = int(os.environ.get("CHAT_WINDOW", "50"))
 
 st.set_page_config(page_title="LiveKit Voice Agent", page_icon="🎙️", layout="wide")
 
@@ -22,8 +34,8 @@ if "isconnected" not in st.session_state:
     st.session_state.isconnected = False
 if "room" not in st.session_state:
     st.session_state.room = None
-if "chat_messages" not in st.session_state:
-    st.session_state.chat_messages = []
+if "conversation" not in st.session_state:
+    st.session_state.conversation = ConversationStore()
 if "async_loop" not in st.session_state:
     st.session_state.async_loop = None
 if "mic_stream" not in st.session_state:
@@ -32,33 +44,35 @@ if "mic_stream" not in st.session_state:
 async def connect_and_run(loop):
     st.session_state.room = rtc.Room(loop=loop)
     room = st.session_state.room
+    # Updated from this thread, the script only reads snapshots of it
+    conversation = st.session_state.conversation
+
+    def decode_payloads(data: bytes) -> list:
+        # JSON packets start with "{", anything else is the binary wire format
+        if data[:1] != b"{":
+            return decode_packet(data)
+        payload = json.loads(data.decode("utf-8"))
+        if payload["type"] == "batch":
+            return payload["events"]
+        return [payload]
 
     @room.on("data_received")
     def on_data_received(data: bytes, participant: rtc.RemoteParticipant):
-        payload = json.loads(data.decode("utf-8"))
-        if payload["type"] == "user_transcript":
-            text, is_final = payload["text"], payload["is_final"]
-            if st.session_state.chat_messages and st.session_state.chat_messages[-1]["role"] == "user":
-                st.session_state.chat_messages[-1].update({"content": text, "is_final": is_final})
-            else:
-                st.session_state.chat_messages.append({"role": "user", "content": text, "is_final": is_final})
-        elif payload["type"] == "agent_chunk":
-            text = payload["text"]
-            if st.session_state.chat_messages and st.session_state.chat_messages[-1]["role"] == "assistant":
-                st.session_state.chat_messages[-1]["content"] += text
-            else:
-                st.session_state.chat_messages.append({"role": "assistant", "content": text})
-        st.rerun()
+        # Decoded here, off the rerun path; chat_history() picks the changes up
+        for payload in decode_payloads(data):
+            conversation.apply(payload)
 
-    token = (
-        AccessToken(LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
-        .with_identity("streamlit-user")
-        .with_name("Streamlit User")
-        .with_grants(VideoGrants(room="gemini-test-room", room_join=True))
-        .to_jwt()
-    )
+    params = {"identity": "streamlit-user"}
+    if ROOM_NAME:
+        params["room"] = ROOM_NAME
+    if AGENT_MODEL:
+        params["model"] = AGENT_MODEL
 
     try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            response = await client.get(f"{TOKEN_SERVER_URL}/get-token", params=params)
+            response.raise_for_status()
+        token = response.json()["token"]
         await room.connect(LIVEKIT_URL, token)
         st.session_state.isconnected = True
         st.rerun()
@@ -66,21 +80,26 @@ async def connect_and_run(loop):
         mic_track = rtc.LocalAudioTrack.create_audio_track("mic", audio_source)
         await room.local_participant.publish_track(mic_track)
 
-        def callback(indata, frames, time, status):
-            if status:
-                print(status, flush=True)
-            pcm_data = (indata * 32767).astype(np.int16)
-            asyncio.run_coroutine_threadsafe(
-                audio_source.capture_frame(pcm_data),
-                loop
-            )
+        # Capture at the device's native rate, MicCapture resamples to 16 kHz
+        device_rate = int(sd.query_devices(kind="input")["default_samplerate"])
+        capture = MicCapture(audio_source, loop, device_rate=device_rate, frame_ms=MIC_FRAME_MS)
+        pump = asyncio.create_task(capture.run())
 
         st.session_state.mic_stream = sd.InputStream(
-            channels=1, samplerate=16000, dtype="float32", callback=callback)
+            channels=1,
+            samplerate=device_rate,
+            dtype="int16",
+            blocksize=capture.device_frame_samples,
+            callback=capture.callback,
+        )
         st.session_state.mic_stream.start()
-        
-        while room.isconnected:
-            await asyncio.sleep(0.1)
+
+        try:
+            while room.isconnected:
+                await asyncio.sleep(0.1)
+        finally:
+            pump.cancel()
+            print(f"Mic capture stats: {capture.stats}", flush=True)
     except Exception as e:
         st.error(f"Failed to connect: {e}")
         st.session_state.isconnected = False
@@ -117,16 +136,28 @@ def stop_connection():
         st.session_state.isconnected = False
         st.rerun()
 
+# Only ticks while connected, nothing else changes the chat
+@st.fragment(run_every=CHAT_FRAME_BUDGET if st.session_state.isconnected else None)
+def chat_history():
+    """Redraws only the chat, once per frame budget instead of a full rerun per packet."""
+    conversation = st.session_state.conversation
+    # Streamlit drops whatever a fragment run does not draw, so idle frames
+    # draw again too, but from the last snapshot
+    if st.session_state.get("chat_version") != conversation.version:
+        st.session_state.chat_version = conversation.version
+        st.session_state.chat_snapshot = conversation.window(CHAT_WINDOW)
+    hidden, messages = st.session_state.chat_snapshot
+    if hidden:
+        st.caption(f"{hidden} earlier messages")
+    for _, role, text, is_final, _ in messages:
+        with st.chat_message(role):
+            st.markdown(text if is_final else text + "...")
+
 st.title("🎙️ LiveKit Voice Agent (Gemini Integration)")
 if not KEYS_LOADED:
-    st.error("⚠️ LiveKit credentials not loaded. Please check your .env file.")
+    st.error("⚠️ LIVEKIT_URL is not set. Please check your .env file.")
 else:
-    for msg in st.session_state.chat_messages:
-        with st.chat_message(msg["role"]):
-            content = msg["content"]
-            if msg["role"] == "user" and not msg.get("is_final", True):
-                content += "..."
-            st.markdown(content)
+    chat_history()
     if st.session_state.isconnected:
         if st.button("🔴 Disconnect"):
             stop_connection()